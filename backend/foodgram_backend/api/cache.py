@@ -0,0 +1,15 @@
+from recipes.versions import get_versions
+
+
+def get_or_set_versioned(cache, key, compute, timeout=None):
+    # compute возвращает значение и версии объектов, из которых оно
+    # собрано: {(вид, pk): версия}. Запись действительна, пока ни одна
+    # из версий не изменилась, поэтому длинный TTL безопасен.
+    entry = cache.get(key)
+    if entry is not None:
+        value, versions = entry
+        if get_versions(versions) == versions:
+            return value
+    value, versions = compute()
+    cache.set(key, (value, versions), timeout)
+    return value
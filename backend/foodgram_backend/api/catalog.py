@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+
+import orjson
+from django.conf import settings
+from django.db.models import Max
+
+from recipes.models import Ingredient, IngredientChange
+
+from .compression import ENCODINGS, compress
+
+EXTENSIONS = {"identity": ".json", "gzip": ".json.gz", "br": ".json.br"}
+# Сколько предыдущих версий снимка оставлять на диске: воркер, который
+# еще не увидел новую версию, может читать или записывать старую.
+KEEP_PREVIOUS = 2
+
+
+class Snapshot:
+    def __init__(self, version, ingredients, bodies):
+        self.version = version
+        self.ingredients = ingredients
+        self.bodies = bodies
+        # Список для /api/ingredients/ без фильтра, закодированный один раз
+        # на версию.
+        self.list_body = orjson.dumps(ingredients)
+        # Слабый ETag: все кодировки описывают одно и то же содержимое.
+        self.etag = f'W/"ingredients-{version}"'
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def current_version():
+    version = IngredientChange.objects.aggregate(version=Max("id"))
+    return version["version"] or 0
+
+
+def serialize_ingredients(queryset):
+    return [
+        {"id": pk, "name": name, "measurement_unit": unit}
+        for pk, name, unit in queryset.values_list("id", "name", "measurment")
+    ]
+
+
+def build_snapshot(version):
+    ingredients = serialize_ingredients(Ingredient.objects.order_by("name"))
+    body = orjson.dumps({"version": version, "ingredients": ingredients})
+    bodies = {"identity": body}
+    for encoding in ENCODINGS:
+        bodies[encoding] = compress(body, encoding)
+    return Snapshot(version, ingredients, bodies)
+
+
+def _snapshot_path(version, encoding):
+    return os.path.join(
+        settings.INGREDIENT_SNAPSHOT_ROOT,
+        f"ingredients-{version}{EXTENSIONS[encoding]}",
+    )
+
+
+def load_snapshot(version):
+    try:
+        with open(_snapshot_path(version, "identity"), "rb") as file:
+            body = file.read()
+    except FileNotFoundError:
+        return None
+    bodies = {"identity": body}
+    for encoding in ENCODINGS:
+        try:
+            with open(_snapshot_path(version, encoding), "rb") as file:
+                bodies[encoding] = file.read()
+        except FileNotFoundError:
+            pass
+    return Snapshot(version, orjson.loads(body)["ingredients"], bodies)
+
+
+def save_snapshot(snapshot):
+    os.makedirs(settings.INGREDIENT_SNAPSHOT_ROOT, exist_ok=True)
+    # Несжатый файл пишется последним: по нему проверяется наличие снимка.
+    for encoding in (*ENCODINGS, "identity"):
+        if encoding not in snapshot.bodies:
+            continue
+        fd, temp_path = tempfile.mkstemp(
+            dir=settings.INGREDIENT_SNAPSHOT_ROOT, prefix=".snapshot-"
+        )
+        with os.fdopen(fd, "wb") as file:
+            file.write(snapshot.bodies[encoding])
+        os.replace(temp_path, _snapshot_path(snapshot.version, encoding))
+
+    # Удаляются только версии старше записанной: воркер со старой
+    # версией не должен удалить снимок, который новее его собственного.
+    versions = {}
+    for filename in os.listdir(settings.INGREDIENT_SNAPSHOT_ROOT):
+        version = _snapshot_version(filename)
+        if version is not None and version < snapshot.version:
+            versions.setdefault(version, []).append(filename)
+    stale = sorted(versions)[:max(len(versions) - KEEP_PREVIOUS, 0)]
+    for version in stale:
+        for filename in versions[version]:
+            try:
+                os.remove(
+                    os.path.join(settings.INGREDIENT_SNAPSHOT_ROOT, filename)
+                )
+            except FileNotFoundError:
+                pass
+
+
+def _snapshot_version(filename):
+    # ingredients-42.json.gz -> 42
+    if not filename.startswith("ingredients-"):
+        return None
+    version = filename[len("ingredients-"):].split(".", 1)[0]
+    return int(version) if version.isdigit() else None
+
+
+def get_snapshot():
+    global _snapshot
+    # Версию читаем до каталога: если каталог изменится между запросами,
+    # снимок окажется новее своей версии, и дельта просто повторит
+    # изменения.
+    version = current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is not None and _snapshot.version == version:
+            return _snapshot
+        snapshot = None
+        if settings.INGREDIENT_SNAPSHOT_ROOT:
+            snapshot = load_snapshot(version)
+        if snapshot is None:
+            snapshot = build_snapshot(version)
+            if settings.INGREDIENT_SNAPSHOT_ROOT:
+                save_snapshot(snapshot)
+        _snapshot = snapshot
+    return snapshot
+
+
+def get_changes(since):
+    version = current_version()
+    operations = dict(
+        IngredientChange.objects.filter(id__gt=since, id__lte=version)
+        .order_by("id")
+        .values_list("ingredient_id", "operation")
+    )
+    upserted = [
+        pk for pk, operation in operations.items()
+        if operation == IngredientChange.Operation.UPSERT
+    ]
+    updated = serialize_ingredients(
+        Ingredient.objects.filter(id__in=upserted).order_by("name")
+    )
+    existing = {ingredient["id"] for ingredient in updated}
+    return {
+        "version": version,
+        "since": since,
+        "updated": updated,
+        "deleted": sorted(set(operations) - existing),
+    }
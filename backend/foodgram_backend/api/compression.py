@@ -0,0 +1,90 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Кодировки в порядке предпочтения.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# wbits=31: поток deflate с заголовком и контрольной суммой gzip.
+GZIP_WBITS = 31
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        coding, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header, available=ENCODINGS):
+    accepted = accepted_encodings(header)
+    for encoding in ENCODINGS:
+        if encoding in accepted and encoding in available:
+            return encoding
+    return "identity"
+
+
+def compress(data, encoding, level=None):
+    if encoding == "br":
+        if level is None:
+            return brotli.compress(data)
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level or 9, mtime=0)
+
+
+class StreamCompressor:
+    # Сжимает поток по частям: каждый фрагмент сбрасывается сразу, чтобы
+    # клиент получал данные, не дожидаясь конца ответа.
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=level)
+        else:
+            self.compressor = zlib.compressobj(
+                level, zlib.DEFLATED, GZIP_WBITS
+            )
+
+    def compress(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if self.encoding == "br":
+            return self.compressor.process(chunk) + self.compressor.flush()
+        return self.compressor.compress(chunk) + self.compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def compress_stream(chunks, encoding, level):
+    compressor = StreamCompressor(encoding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks, encoding, level):
+    compressor = StreamCompressor(encoding, level)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
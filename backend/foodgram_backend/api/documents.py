@@ -0,0 +1,170 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Q
+from django.http import Http404
+
+from recipes.models import (
+    AmountIngredientInRecipe,
+    Follow,
+    Recipe,
+    RecipeDocument,
+    UserFavorite,
+    WishList,
+)
+from foodgram_backend.cache import get_cache
+from recipes.versions import RECIPE, USER, get_versions
+
+from .cache import get_or_set_versioned
+from .serializers import RecipeSerializer
+
+User = get_user_model()
+
+# Меняется вместе со структурой документа: документы старого формата
+# считаются устаревшими, до пересборки командой rebuild_recipe_documents
+# они собираются при чтении в памяти.
+FORMAT = 1
+BATCH_SIZE = 500
+
+
+def document_versions(document):
+    return {
+        (RECIPE, document.recipe_id): document.recipe_version,
+        (USER, document.data["author"]["id"]): document.author_version,
+    }
+
+
+def serialize_documents(recipe_ids):
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).select_related(
+        "author"
+    ).prefetch_related(
+        Prefetch(
+            "amountingredientinrecipe_set",
+            queryset=AmountIngredientInRecipe.objects.select_related(
+                "ingredient"
+            ),
+        )
+    )
+    # Без request в контексте флаги пользователя в документе всегда false,
+    # при чтении их подставляет merge_viewer_flags.
+    return [
+        RecipeDocument(
+            recipe=recipe,
+            data=RecipeSerializer(recipe).data,
+            format=FORMAT,
+            recipe_version=recipe.version,
+            author_version=recipe.author.version,
+        )
+        for recipe in recipes
+    ]
+
+
+def build_documents(recipe_ids):
+    documents = serialize_documents(recipe_ids)
+    RecipeDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["recipe"],
+        update_fields=[
+            "data",
+            "format",
+            "recipe_version",
+            "author_version",
+            "built_at",
+        ],
+    )
+    return documents
+
+
+def rebuild_documents(recipe_ids=None, batch_size=BATCH_SIZE):
+    if recipe_ids is None:
+        recipe_ids = Recipe.objects.order_by("pk").values_list(
+            "pk", flat=True
+        )
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), batch_size):
+        build_documents(recipe_ids[start:start + batch_size])
+        yield min(start + batch_size, len(recipe_ids))
+
+
+def stale_recipe_ids():
+    # Рецепты без документа или с документом, собранным до изменения
+    # формата, рецепта или автора.
+    return (
+        Recipe.objects.filter(
+            Q(document__isnull=True)
+            | ~Q(document__format=FORMAT)
+            | ~Q(document__recipe_version=F("version"))
+            | ~Q(document__author_version=F("author__version"))
+        )
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def schedule_rebuild(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: build_documents(recipe_ids))
+
+
+def is_fresh(document):
+    if document.format != FORMAT:
+        return False
+    versions = document_versions(document)
+    return get_versions(versions) == versions
+
+
+def load_document(pk):
+    document = RecipeDocument.objects.filter(recipe_id=pk).first()
+    if document is None or not is_fresh(document):
+        # Пересборка после изменения еще не закоммичена или не удалась.
+        # GET ничего не пишет: документ собирается в памяти и попадает
+        # только в кеш.
+        documents = serialize_documents([pk])
+        if not documents:
+            raise Http404
+        document = documents[0]
+    return document.data, document_versions(document)
+
+
+def get_document(pk):
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise Http404
+    return get_or_set_versioned(
+        get_cache("recipes"), f"document:{pk}", lambda: load_document(pk)
+    )
+
+
+def merge_viewer_flags(data, user):
+    data = {**data, "author": {**data["author"]}}
+    if not user.is_authenticated:
+        return data
+    # Все флаги пользователя одним запросом.
+    flags = (
+        User.objects.filter(pk=user.pk)
+        .annotate(
+            is_favorited=Exists(
+                UserFavorite.objects.filter(
+                    user=OuterRef("pk"), recipe_id=data["id"]
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                WishList.objects.filter(
+                    user=OuterRef("pk"), recipe_id=data["id"]
+                )
+            ),
+            is_subscribed=Exists(
+                Follow.objects.filter(
+                    user=OuterRef("pk"), following_id=data["author"]["id"]
+                )
+            ),
+        )
+        .values("is_favorited", "is_in_shopping_cart", "is_subscribed")
+        .first()
+    )
+    if flags:
+        data["is_favorited"] = flags["is_favorited"]
+        data["is_in_shopping_cart"] = flags["is_in_shopping_cart"]
+        data["author"]["is_subscribed"] = flags["is_subscribed"]
+    return data
@@ -1,6 +1,14 @@
 import django_filters.rest_framework as filters
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from recipes.models import Recipe
 
+User = get_user_model()
+
+# Поля, по началу которых ищутся пользователи. Под каждое есть индекс
+# по UPPER(поле), см. users.models.User.Meta.
+USER_SEARCH_FIELDS = ("username", "first_name", "last_name")
+
 
 class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
@@ -32,3 +40,20 @@ class RecipeFilter(filters.FilterSet):
         if value:
             return queryset.filter(userfavorite_set__user=self.request.user)
         return queryset
+
+
+class UserFilter(filters.FilterSet):
+    search = filters.CharFilter(method="filter_search")
+
+    class Meta:
+        model = User
+        fields = []
+
+    def filter_search(self, queryset, name, value):
+        # "Иван Пет" - каждое слово должно быть началом одного из полей.
+        for term in value.split()[:3]:
+            condition = Q()
+            for field in USER_SEARCH_FIELDS:
+                condition |= Q(**{f"{field}__istartswith": term})
+            queryset = queryset.filter(condition)
+        return queryset
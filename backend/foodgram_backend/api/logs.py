@@ -0,0 +1,75 @@
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+# Стандартные атрибуты LogRecord, которые не попадают в JSON как поля.
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class BackgroundHandler(QueueHandler):
+    # Запись в поток вывода выполняет отдельный поток, запрос только
+    # кладет строку в очередь. При переполнении очереди записи
+    # отбрасываются, а не блокируют воркер.
+    def __init__(self, stream=None, maxsize=10000):
+        self.stream = stream or sys.stdout
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.pid = None
+        self.listener = None
+        self.lock = threading.Lock()
+        super().__init__(queue.Queue(maxsize))
+
+    def start(self):
+        # Слушатель запускается лениво в каждом процессе: потоки не
+        # переживают fork воркеров gunicorn при preload_app.
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self.listener = QueueListener(
+                self.queue, logging.StreamHandler(self.stream)
+            )
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        super().close()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from foodgram_backend.cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = "Показывает долю попаданий по уровням именованных кешей"
+
+    def handle(self, *args, **options):
+        for name, stats in cache_stats().items():
+            self.stdout.write(
+                f"{name}: локальный {format_ratio(stats['local_hit_ratio'])} "
+                f"({stats['local_hits']}/"
+                f"{stats['local_hits'] + stats['local_misses']}), "
+                f"общий {format_ratio(stats['shared_hit_ratio'])} "
+                f"({stats['shared_hits']}/"
+                f"{stats['shared_hits'] + stats['shared_misses']}), "
+                f"вычислений {stats['computes']}, "
+                f"досрочных {stats['early_computes']}, "
+                f"ожиданий блокировки {stats['lock_waits']}"
+            )
+
+
+def format_ratio(ratio):
+    return "-" if ratio is None else f"{ratio:.1%}"
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from api.queries import inspect_queries
+from recipes.models import Recipe
+
+User = get_user_model()
+
+# Списки, в которых поля сериализатора вычисляются для каждой строки.
+ENDPOINTS = (
+    "/api/recipes/?limit={limit}",
+    "/api/recipes/?limit={limit}&is_favorited=1",
+    "/api/recipes/?limit={limit}&is_in_shopping_cart=1",
+    "/api/recipes/{recipe}/",
+    "/api/recipes/{recipe}/similar/",
+    "/api/users/?limit={limit}",
+    "/api/users/subscriptions/?limit={limit}&recipes_limit=3",
+    "/api/users/followers/?limit={limit}",
+    "/api/users/mutual/?limit={limit}",
+    "/api/users/suggestions/?limit=10",
+    "/api/ingredients/?name=а",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Запрашивает списки API и падает, если ответ - ошибка или один и "
+        "тот же SQL выполняется больше заданного числа раз за запрос (N+1)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--email",
+            help="Пользователь, от имени которого идут запросы. По "
+            "умолчанию - пользователь с наибольшим числом подписок.",
+        )
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--repeat-limit", type=int, default=3)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["email"])
+        recipe = Recipe.objects.order_by("-id").first()
+        if recipe is None:
+            raise CommandError("В базе нет рецептов.")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        failures = 0
+        for endpoint in ENDPOINTS:
+            path = endpoint.format(limit=options["limit"], recipe=recipe.pk)
+            with inspect_queries(
+                action="warn", limit=options["repeat_limit"], slow_ms=0
+            ) as inspector:
+                response = client.get(path)
+            repeated = inspector.repeated()
+            # Ответ с ошибкой ничего не говорит о запросах списка.
+            failed = response.status_code >= 400
+            failures += bool(repeated) or failed
+            self.stdout.write(
+                f"{path}: {response.status_code}"
+                f"{' (ошибка)' if failed else ''}, "
+                f"запросов {sum(inspector.counts.values())}"
+            )
+            for key, count in repeated.items():
+                self.stdout.write(f"  N+1 ({count} раз): {key[:200]}")
+                for line in inspector.stacks[key]:
+                    self.stdout.write(f"    {line}")
+        if failures:
+            raise CommandError(f"Списков с ошибкой или N+1: {failures}")
+
+    def get_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь {email} не найден.")
+        user = (
+            User.objects.annotate(follows=Count("follower"))
+            .order_by("-follows")
+            .first()
+        )
+        if user is None:
+            raise CommandError("В базе нет пользователей.")
+        return user
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from api.compression import ENCODINGS, compress
+
+DEFAULT_PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?limit=50",
+    "/api/ingredients/",
+    "/api/ingredients/?name=мо",
+    "/api/users/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает, сколько байт экономит сжатие ответов и сколько "
+        "процессорного времени оно стоит"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Адрес для замера, можно указать несколько раз.",
+        )
+        parser.add_argument(
+            "--token", help="Токен для эндпоинтов, требующих авторизации."
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        client = Client()
+        headers = {"HTTP_ACCEPT_ENCODING": "identity"}
+        if options["token"]:
+            headers["HTTP_AUTHORIZATION"] = f"Token {options['token']}"
+        repeat = max(options["repeat"], 1)
+
+        self.stdout.write(
+            f"{'endpoint':40} {'bytes':>9}"
+            + "".join(
+                f" {encoding + ' bytes':>11} {'saved':>7} {'cpu ms':>7}"
+                for encoding in ENCODINGS
+            )
+        )
+        for path in options["paths"] or DEFAULT_PATHS:
+            response = client.get(path, **headers)
+            if response.status_code != 200:
+                raise CommandError(f"{path}: статус {response.status_code}")
+            content = response.content
+            line = f"{path:40} {len(content):>9}"
+            for encoding in ENCODINGS:
+                level = settings.COMPRESSION_LEVELS[encoding]
+                start = time.process_time()
+                for _ in range(repeat):
+                    compressed = compress(content, encoding, level)
+                cpu_ms = (time.process_time() - start) / repeat * 1000
+                saved = 1 - len(compressed) / len(content) if content else 0
+                line += (
+                    f" {len(compressed):>11} {saved:>7.1%} {cpu_ms:>7.2f}"
+                )
+            self.stdout.write(line)
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodgram_backend.images import evict_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет давно не запрошенные уменьшенные копии изображений, "
+        "если кеш больше IMAGE_CACHE_MAX_BYTES"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-bytes",
+            type=int,
+            default=settings.IMAGE_CACHE_MAX_BYTES,
+            help="Предельный размер кеша в байтах.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            help="Не завершаться, а проверять кеш раз в столько секунд.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            removed = evict_variants(options["max_bytes"])
+            self.stdout.write(f"Удалено копий: {removed}")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,149 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.deletion import delete_in_batches
+from recipes.models import Follow
+
+User = get_user_model()
+
+PREFIX = "graphbench"
+BATCH_SIZE = 10_000
+ENDPOINTS = (
+    "/api/users/followers/",
+    "/api/users/mutual/",
+    "/api/users/suggestions/",
+    "/api/users/subscriptions/",
+)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит синтетический граф подписок и замеряет эндпоинты "
+        "подписчиков, взаимных подписок и рекомендаций"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument("--edges", type=int, default=1_000_000)
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=30,
+            help="Сколько пользователей опросить на каждый эндпоинт.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--cleanup",
+            action="store_true",
+            help="Удалить синтетический граф и выйти.",
+        )
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            self.cleanup()
+            return
+        rng = random.Random(options["seed"])
+        user_ids = self.build_graph(
+            options["users"], options["edges"], rng
+        )
+        # Популярные авторы в начале списка, обычные пользователи - в конце.
+        hot = user_ids[:max(options["samples"] // 3, 1)]
+        samples = hot + rng.sample(
+            user_ids, min(options["samples"] - len(hot), len(user_ids))
+        )
+        users = User.objects.in_bulk(samples)
+        client = APIClient()
+
+        self.stdout.write(
+            f"{'endpoint':32} {'mode':6} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'max ms':>8} {'queries':>8}"
+        )
+        for endpoint in ENDPOINTS:
+            for mode, cache in (("sql", False), ("cache", True)):
+                with override_settings(SOCIAL_GRAPH_CACHE=cache):
+                    if cache:
+                        # Замеряется прогретый кеш списков смежности.
+                        self.measure(client, endpoint, users.values())
+                    timings, queries = self.measure(
+                        client, endpoint, users.values()
+                    )
+                self.stdout.write(
+                    f"{endpoint:32} {mode:6} "
+                    f"{percentile(timings, 0.5):>8.1f} "
+                    f"{percentile(timings, 0.95):>8.1f} "
+                    f"{max(timings):>8.1f} "
+                    f"{statistics.mean(queries):>8.1f}"
+                )
+
+    def measure(self, client, endpoint, users):
+        timings = []
+        queries = []
+        for user in users:
+            client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(endpoint, {"limit": 20})
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(context))
+            response.close()
+        return timings, queries
+
+    def build_graph(self, users_count, edges_count, rng):
+        users = User.objects.filter(username__startswith=PREFIX)
+        existing = users.count()
+        if existing < users_count:
+            User.objects.bulk_create(
+                [
+                    User(
+                        username=f"{PREFIX}{index}",
+                        email=f"{PREFIX}{index}@example.com",
+                        first_name="Граф",
+                        last_name=f"{index:07d}",
+                        password="!",
+                    )
+                    for index in range(existing, users_count)
+                ],
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+        user_ids = list(users.order_by("pk").values_list("pk", flat=True))
+
+        edges = Follow.objects.filter(user__username__startswith=PREFIX)
+        missing = edges_count - edges.count()
+        batch = []
+        while missing > 0:
+            follower = rng.choice(user_ids)
+            # Степенное распределение: на первых пользователей подписаны
+            # почти все, как на популярных авторов.
+            following = user_ids[int(len(user_ids) * rng.random() ** 3)]
+            if follower == following:
+                continue
+            batch.append(Follow(user_id=follower, following_id=following))
+            if len(batch) >= BATCH_SIZE or len(batch) >= missing:
+                Follow.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+                missing = edges_count - edges.count()
+                self.stdout.write(f"Связей в графе: {edges_count - missing}")
+        return user_ids
+
+    def cleanup(self):
+        follows = delete_in_batches(
+            Follow.objects.filter(user__username__startswith=PREFIX),
+            BATCH_SIZE,
+        )
+        users = delete_in_batches(
+            User.objects.filter(username__startswith=PREFIX), 1000
+        )
+        self.stdout.write(f"Удалено связей: {follows}, объектов: {users}")
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.documents import BATCH_SIZE, rebuild_documents, stale_recipe_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает документы рецептов пачками. Нужен после изменения "
+        "формата документа или массовых правок в обход API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            help="Только документы, устаревшие после изменения рецепта "
+            "или автора.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            help="Не завершаться, а искать устаревшие документы раз в "
+            "столько секунд.",
+        )
+
+    def handle(self, *args, **options):
+        stale = options["stale"] or bool(options["interval"])
+        while True:
+            recipe_ids = stale_recipe_ids() if stale else None
+            for done in rebuild_documents(
+                recipe_ids, batch_size=options["batch_size"]
+            ):
+                self.stdout.write(f"Собрано документов: {done}")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import RecipeSerializer
+from recipes.models import AmountIngredientInRecipe, Recipe
+
+RENDERERS = (
+    ("json (DRF)", JSONRenderer),
+    ("orjson", ORJSONRenderer),
+    ("msgpack", MessagePackRenderer),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет рендеринг страницы рецептов стандартным JSONRenderer, "
+        "orjson и msgpack"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-sizes",
+            type=int,
+            nargs="+",
+            default=[6, 50, 200],
+            help="Размеры страницы: 6 - по умолчанию в API, 50 и 200 - "
+            "большие limit (рецепты из базы повторяются).",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_sizes = options["page_sizes"]
+        recipes = RecipeSerializer(
+            Recipe.objects.select_related("author").prefetch_related(
+                Prefetch(
+                    "amountingredientinrecipe_set",
+                    queryset=AmountIngredientInRecipe.objects.select_related(
+                        "ingredient"
+                    ),
+                )
+            )[:max(page_sizes)],
+            many=True,
+        ).data
+        if not recipes:
+            raise CommandError("В базе нет рецептов.")
+        repeat = max(options["repeat"], 1)
+
+        self.stdout.write(f"Повторов: {repeat}")
+        self.stdout.write(
+            f"{'page':>5} {'renderer':12} {'ms':>8} {'bytes':>10}"
+        )
+        for page_size in page_sizes:
+            results = [
+                recipes[index % len(recipes)] for index in range(page_size)
+            ]
+            data = {
+                "count": len(results),
+                "next": None,
+                "previous": None,
+                "results": results,
+            }
+            for name, renderer_class in RENDERERS:
+                renderer = renderer_class()
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    content = renderer.render(data)
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.stdout.write(
+                    f"{page_size:>5} {name:12} "
+                    f"{statistics.median(timings):8.2f} {len(content):10}"
+                )
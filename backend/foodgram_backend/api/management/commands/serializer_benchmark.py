@@ -0,0 +1,60 @@
+import statistics
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from api.serializers import DirectRepresentationMixin, RecipeSerializer
+from recipes.models import AmountIngredientInRecipe, Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время сериализации списка рецептов через "
+        "DirectRepresentationMixin и стандартный обход полей DRF"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        recipes = list(
+            Recipe.objects.select_related("author").prefetch_related(
+                Prefetch(
+                    "amountingredientinrecipe_set",
+                    queryset=AmountIngredientInRecipe.objects.select_related(
+                        "ingredient"
+                    ),
+                )
+            )[:options["recipes"]]
+        )
+        if not recipes:
+            raise CommandError("В базе нет рецептов.")
+        repeat = max(options["repeat"], 1)
+
+        direct, direct_data = self.measure(recipes, repeat)
+        with mock.patch.object(
+            DirectRepresentationMixin,
+            "to_representation",
+            serializers.Serializer.to_representation,
+        ):
+            stock, stock_data = self.measure(recipes, repeat)
+        if direct_data != stock_data:
+            raise CommandError("Ответы сериализаторов различаются.")
+
+        self.stdout.write(f"Рецептов: {len(recipes)}, повторов: {repeat}")
+        self.stdout.write(f"DRF:     {stock:8.1f} мс")
+        self.stdout.write(
+            f"прямой:  {direct:8.1f} мс (x{stock / direct:.1f})"
+        )
+
+    def measure(self, recipes, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = RecipeSerializer(recipes, many=True).data
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), data
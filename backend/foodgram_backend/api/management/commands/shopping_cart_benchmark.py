@@ -0,0 +1,73 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.units import aggregate_ingredients, load_units_table
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет объединение списка покупок на синтетической корзине "
+        "из заданного числа рецептов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, default=10
+        )
+        parser.add_argument(
+            "--catalog",
+            type=int,
+            default=300,
+            help="Сколько разных ингредиентов встречается в корзине.",
+        )
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        units, _ = load_units_table()
+        if not units:
+            raise CommandError("Таблица единиц измерения не загружена.")
+        catalog = list(
+            Ingredient.objects.values_list("name", "measurment")[
+                :options["catalog"]
+            ]
+        )
+        if not catalog:
+            raise CommandError("В базе нет ингредиентов.")
+        rng = random.Random(options["seed"])
+        measurments = [value for value, _ in Ingredient.Measurment.choices]
+        # Строки как из запроса download_shopping_cart. Часть строк
+        # в других единицах, чтобы было что пересчитывать.
+        rows = []
+        for _ in range(options["recipes"]):
+            for name, measurment in rng.sample(
+                catalog, min(options["ingredients_per_recipe"], len(catalog))
+            ):
+                if rng.random() < 0.3:
+                    measurment = rng.choice(measurments)
+                rows.append(
+                    {
+                        "ingredient__name": name,
+                        "ingredient__measurment": measurment,
+                        "amount": rng.randint(1, 500),
+                    }
+                )
+
+        timings = []
+        for _ in range(max(options["repeat"], 1)):
+            start = time.perf_counter()
+            result = aggregate_ingredients(rows)
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"Рецептов: {options['recipes']}, строк корзины: {len(rows)}, "
+            f"строк списка: {len(result)}"
+        )
+        self.stdout.write(
+            f"медиана {statistics.median(timings):.2f} мс, "
+            f"максимум {max(timings):.2f} мс"
+        )
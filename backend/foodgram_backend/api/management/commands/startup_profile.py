@@ -0,0 +1,136 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# То же, что делает воркер gunicorn до первого запроса.
+BOOT_SCRIPT = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import foodgram_backend.wsgi\n"
+    "print((time.perf_counter() - start) * 1000)\n"
+)
+
+
+def run_boot(importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    result = subprocess.run(
+        command + ["-c", BOOT_SCRIPT],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def parse_importtime(output):
+    # Строки вида "import time:  self [us] | cumulative | module".
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return modules
+
+
+def group_by_package(modules):
+    packages = {}
+    for module in modules:
+        package = module["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + module["self_ms"]
+    return sorted(packages.items(), key=lambda item: -item[1])
+
+
+class Command(BaseCommand):
+    help = "Измеряет время холодного старта воркера и стоимость импортов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Сколько самых дорогих модулей и пакетов показать.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Количество запусков для замера времени старта.",
+        )
+        parser.add_argument(
+            "--budget",
+            type=float,
+            help="Допустимая медиана времени старта, мс. При превышении "
+            "команда завершается с ошибкой.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Вывести отчет в JSON."
+        )
+
+    def handle(self, *args, **options):
+        timings = [run_boot()[0] for _ in range(max(options["repeat"], 1))]
+        _, importtime = run_boot(importtime=True)
+        modules = parse_importtime(importtime)
+        limit = options["limit"]
+        report = {
+            "median_ms": round(statistics.median(timings), 1),
+            "min_ms": round(min(timings), 1),
+            "max_ms": round(max(timings), 1),
+            "modules_imported": len(modules),
+            "top_modules": sorted(
+                modules, key=lambda item: -item["cumulative_ms"]
+            )[:limit],
+            "top_packages": [
+                {"package": package, "self_ms": round(total, 1)}
+                for package, total in group_by_package(modules)[:limit]
+            ],
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+        budget = options["budget"]
+        if budget is not None and report["median_ms"] > budget:
+            raise CommandError(
+                f"Время старта {report['median_ms']} мс превышает "
+                f"бюджет {budget} мс."
+            )
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"Старт воркера: медиана {report['median_ms']} мс "
+            f"(мин. {report['min_ms']}, макс. {report['max_ms']}), "
+            f"модулей: {report['modules_imported']}"
+        )
+        self.stdout.write("\nМодули (накопительно, мс):")
+        for module in report["top_modules"]:
+            self.stdout.write(
+                f"{module['cumulative_ms']:>9.1f} {module['self_ms']:>8.1f}  "
+                f"{'  ' * module['depth']}{module['module']}"
+            )
+        self.stdout.write("\nПакеты (собственное время, мс):")
+        for package in report["top_packages"]:
+            self.stdout.write(
+                f"{package['self_ms']:>9.1f}  {package['package']}"
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.throttling import get_throttled_counts
+
+
+class Command(BaseCommand):
+    help = "Показывает количество отклоненных запросов по действиям"
+
+    def handle(self, *args, **options):
+        for scope, count in sorted(get_throttled_counts().items()):
+            self.stdout.write(f"{scope}: {count}")
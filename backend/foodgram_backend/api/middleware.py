@@ -0,0 +1,160 @@
+import logging
+import re
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject, empty
+
+from .compression import (
+    choose_encoding,
+    compress,
+    compress_async_stream,
+    compress_stream,
+)
+from .queries import inspect_queries, inspector_enabled
+from .timing import current_timings, track_request
+
+access_logger = logging.getLogger("api.access")
+REQUEST_ID_RE = re.compile(r"^[\w.-]{1,64}$")
+
+
+class RequestLogMiddleware:
+    # Самый внешний middleware: пишет по строке JSON на запрос и
+    # отдает разбивку времени в Server-Timing.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.META.get("HTTP_X_REQUEST_ID", "")
+        if not REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+
+        with ExitStack() as stack:
+            timings = stack.enter_context(track_request())
+            stack.enter_context(
+                connection.execute_wrapper(timings.execute_wrapper)
+            )
+            if inspector_enabled():
+                inspector = stack.enter_context(
+                    inspect_queries(request_id=request_id)
+                )
+                stack.callback(inspector.report, request.path)
+            response = self.get_response(request)
+            total = timings.total()
+
+        response.headers["X-Request-ID"] = request_id
+        if settings.SERVER_TIMING:
+            response.headers["Server-Timing"] = timings.server_timing()
+
+        ms = timings.milliseconds()
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "request_id": request_id,
+                "method": request.method,
+                "path": request.path,
+                "view": getattr(request, "log_view", None),
+                "action": getattr(request, "log_action", None),
+                "user_id": get_user_id(request),
+                "status": response.status_code,
+                "duration_ms": round(total * 1000, 2),
+                "db_ms": ms["db"],
+                "db_queries": timings.queries,
+                "serialize_ms": ms["serialize"],
+                "render_ms": ms["render"],
+                "response_bytes": (
+                    None if response.streaming else len(response.content)
+                ),
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        request.log_view = match.view_name if match else None
+        actions = getattr(view_func, "actions", None)
+        if actions:
+            request.log_action = actions.get(request.method.lower())
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после этого вызова.
+        start = time.perf_counter()
+        timings = current_timings()
+
+        def rendered(response):
+            if timings is not None:
+                timings.add("render", time.perf_counter() - start)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def get_user_id(request):
+    # DRF записывает пользователя в request после аутентификации. Если
+    # до него дело не дошло, не вычисляем ленивый объект ради лога.
+    user = request.__dict__.get("user")
+    if user is None:
+        return None
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if encoding == "identity":
+            return response
+        level = settings.COMPRESSION_LEVELS[encoding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_async_stream(
+                    response.streaming_content, encoding, level
+                )
+            else:
+                response.streaming_content = compress_stream(
+                    response.streaming_content, encoding, level
+                )
+            # Размер сжатого потока заранее неизвестен.
+            del response.headers["Content-Length"]
+        else:
+            content = compress(response.content, encoding, level)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def is_compressible(self, response):
+        if response.has_header("Content-Encoding"):
+            return False
+        if not response.streaming and (
+            len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0]
+        return content_type.strip().lower() in settings.COMPRESSION_TYPES
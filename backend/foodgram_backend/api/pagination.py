@@ -1,5 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+KeysetCursor = namedtuple("KeysetCursor", ["value", "pk", "reverse"])
 
 
 class CustomUserPagination(PageNumberPagination):
@@ -15,3 +24,99 @@ class CustomUserPagination(PageNumberPagination):
                 "results": data,
             }
         )
+
+
+class RecipeScorePagination(CursorPagination):
+    # Курсор хранит пару (оценка, id), а не только оценку, как в
+    # CursorPagination: при множестве рецептов с одинаковой оценкой
+    # страница выбирается по ключу, а не смещением. Сортировка и условие
+    # идут по колонкам RecipeScore в порядке индексов
+    # recipescore_popularity_idx и recipescore_trending_idx.
+    page_size_query_param = "limit"
+    orderings = {
+        "popular": ("popularity", int),
+        "trending": ("trending", float),
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.field, self.value_type = self.orderings[
+            request.query_params.get("ordering")
+        ]
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        field = f"score__{self.field}"
+        if reverse:
+            ordering = (field, "score__recipe_id")
+        else:
+            ordering = (f"-{field}", "-score__recipe_id")
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            lookup = "gt" if reverse else "lt"
+            queryset = queryset.filter(
+                Q(**{f"{field}__{lookup}": self.cursor.value})
+                | Q(
+                    **{
+                        field: self.cursor.value,
+                        f"score__recipe_id__{lookup}": self.cursor.pk,
+                    }
+                )
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.position(self.page[-1], False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.position(self.page[0], True))
+
+    def position(self, recipe, reverse):
+        return KeysetCursor(
+            getattr(recipe.score, self.field), recipe.pk, reverse
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            return KeysetCursor(
+                self.value_type(tokens["v"][0]),
+                int(tokens["i"][0]),
+                bool(int(tokens.get("r", ["0"])[0])),
+            )
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        tokens = {"v": repr(cursor.value), "i": cursor.pk}
+        if cursor.reverse:
+            tokens["r"] = "1"
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
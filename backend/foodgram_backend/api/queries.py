@@ -0,0 +1,134 @@
+import logging
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("api.queries")
+
+# Нормализация SQL: одинаковые запросы с разными значениями и разной
+# длиной списков IN дают один отпечаток.
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"(?:\(\.\.\.\)\s*,\s*)+\(\.\.\.\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+)
+STACK_DEPTH = 8
+# Обертки вокруг запроса и сериализатора, не интересные в стеке.
+IGNORED_FILES = ("api/middleware.py", "api/queries.py", "api/timing.py")
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def project_stack():
+    # Только кадры проекта: строки из Django и DRF ничего не говорят о
+    # том, какое поле сериализатора сделало запрос.
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(root)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith(IGNORED_FILES)
+    ]
+    return [
+        f"{frame.filename[len(root) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in frames[-STACK_DEPTH:]
+    ]
+
+
+class QueryInspector:
+    def __init__(self, action, limit, slow_ms, request_id=None):
+        self.action = action
+        self.limit = limit
+        self.slow = slow_ms / 1000 if slow_ms else None
+        self.request_id = request_id
+        self.counts = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if self.slow is not None and duration >= self.slow:
+                logger.warning(
+                    "Медленный запрос: %.1f мс",
+                    duration * 1000,
+                    extra={
+                        "request_id": self.request_id,
+                        "sql": sql,
+                        "duration_ms": round(duration * 1000, 2),
+                        "stack": project_stack(),
+                    },
+                )
+            if self.action:
+                self.count(sql)
+
+    def count(self, sql):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] != self.limit + 1:
+            return
+        # Стек снимается один раз, на запросе, превысившем порог.
+        self.stacks[key] = project_stack()
+        if self.action == "raise":
+            raise NPlusOneError(
+                f"Запрос выполнен больше {self.limit} раз: {key}"
+            )
+
+    def repeated(self):
+        return {
+            key: count
+            for key, count in self.counts.items()
+            if count > self.limit
+        }
+
+    def report(self, path=None):
+        for key, count in self.repeated().items():
+            logger.warning(
+                "Возможен N+1: запрос выполнен %s раз",
+                count,
+                extra={
+                    "request_id": self.request_id,
+                    "path": path,
+                    "fingerprint": key,
+                    "count": count,
+                    "stack": self.stacks.get(key),
+                },
+            )
+
+
+def inspector_enabled():
+    return bool(settings.QUERY_INSPECTOR or settings.SLOW_QUERY_MS)
+
+
+@contextmanager
+def inspect_queries(action=None, limit=None, slow_ms=None, request_id=None):
+    # action: "" - только медленные запросы, "warn" - повторы
+    # собираются для report(), "raise" - NPlusOneError на превышении.
+    # Не переданные параметры берутся из настроек.
+    inspector = QueryInspector(
+        settings.QUERY_INSPECTOR if action is None else action,
+        settings.QUERY_REPEAT_LIMIT if limit is None else limit,
+        settings.SLOW_QUERY_MS if slow_ms is None else slow_ms,
+        request_id,
+    )
+    with connection.execute_wrapper(inspector):
+        yield inspector
@@ -0,0 +1,123 @@
+from django.db import connections, router
+
+
+def insert_ignore_conflicts(model, objs, returning="pk"):
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING: возвращает значения
+    # колонки returning только для реально вставленных строк.
+    # bulk_create(ignore_conflicts=True) здесь не подходит: он не сообщает,
+    # какие строки вставлены, а повторный SELECT не отличит свою строку
+    # от вставленной параллельным запросом. Тогда оба запроса ответили бы
+    # "добавлено", а предварительная проверка существования дает ту же
+    # гонку. Один оператор с RETURNING решает это атомарно; синтаксис
+    # поддерживают PostgreSQL и SQLite 3.35+.
+    if not objs:
+        return []
+
+    opts = model._meta
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    fields = [
+        field for field in opts.concrete_fields
+        if not field.primary_key or not field.auto_created
+    ]
+    if returning == "pk":
+        returning_field = opts.pk
+    else:
+        returning_field = opts.get_field(returning)
+
+    params = []
+    rows = []
+    for obj in objs:
+        values = [
+            field.get_db_prep_save(field.pre_save(obj, add=True), connection)
+            for field in fields
+        ]
+        params.extend(values)
+        rows.append("(" + ", ".join(["%s"] * len(values)) + ")")
+
+    sql = (
+        f"INSERT INTO {quote(opts.db_table)} "
+        f"({', '.join(quote(field.column) for field in fields)}) "
+        f"VALUES {', '.join(rows)} "
+        f"ON CONFLICT DO NOTHING "
+        f"RETURNING {quote(returning_field.column)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def insert_for_existing(model, obj, foreign_key, ids):
+    # Как insert_ignore_conflicts, но строка на каждый id из ids: значения
+    # полей берутся из obj, а внешний ключ foreign_key - из INSERT ...
+    # SELECT по связанной таблице. Объект, удаленный к моменту вставки,
+    # просто в нее не попадет, ошибки внешнего ключа не будет. Возвращает
+    # значения внешнего ключа вставленных строк.
+    ids = list(ids)
+    if not ids:
+        return []
+
+    opts = model._meta
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    key = opts.get_field(foreign_key)
+    target = key.related_model._meta
+    fields = [
+        field for field in opts.concrete_fields
+        if field != key and (not field.primary_key or not field.auto_created)
+    ]
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, add=True), connection)
+        for field in fields
+    ]
+    params.extend(ids)
+
+    columns = [quote(field.column) for field in fields] + [quote(key.column)]
+    sql = (
+        f"INSERT INTO {quote(opts.db_table)} ({', '.join(columns)}) "
+        f"SELECT {', '.join(['%s'] * len(fields))}, "
+        f"{quote(target.pk.column)} FROM {quote(target.db_table)} "
+        f"WHERE {quote(target.pk.column)} IN "
+        f"({', '.join(['%s'] * len(ids))}) "
+        f"ON CONFLICT DO NOTHING "
+        f"RETURNING {quote(key.column)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_returning(model, returning, **lookups):
+    # DELETE ... RETURNING: поддерживаются только точное совпадение и __in.
+    opts = model._meta
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+
+    conditions = []
+    params = []
+    for lookup, value in lookups.items():
+        name, _, operator = lookup.partition("__")
+        column = quote(opts.get_field(name).column)
+        if operator == "in":
+            value = list(value)
+            if not value:
+                return []
+            conditions.append(
+                f"{column} IN ({', '.join(['%s'] * len(value))})"
+            )
+            params.extend(value)
+        else:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+
+    sql = (
+        f"DELETE FROM {quote(opts.db_table)} "
+        f"WHERE {' AND '.join(conditions)} "
+        f"RETURNING {quote(opts.get_field(returning).column)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,89 @@
+import math
+import pickle
+import re
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+# float в pickle - опкод BINFLOAT ("G") и 8 байт big-endian. У NaN и
+# бесконечностей все биты порядка - единицы.
+NON_FINITE_PICKLE = re.compile(rb"G[\x7f\xff][\xf0-\xff]")
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.ensure_ascii or not self.compact:
+            # UNICODE_JSON=False и COMPACT_JSON=False orjson не умеет.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        # Даты и время orjson пишет сам и иначе, чем DRF (микросекунды,
+        # "+00:00" вместо "Z"), поэтому отдаем их кодировщику DRF.
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+
+        content = orjson.dumps(data, default=_default, option=option)
+        # NaN и бесконечность orjson молча пишет как null. Данные проверяем
+        # только тогда, когда null в ответе есть.
+        if b"null" in content and _has_non_finite(data):
+            if self.strict:
+                raise ValueError(
+                    "Out of range float values are not JSON compliant"
+                )
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и DRF, экранируем разделители строк: в JavaScript до ES2019
+        # они не допускались внутри строковых литералов.
+        return content.replace(LINE_SEPARATOR, b"\\u2028").replace(
+            PARAGRAPH_SEPARATOR, b"\\u2029"
+        )
+
+
+def _has_non_finite(data):
+    # Обход данных в Python в несколько раз дольше самого orjson, поэтому
+    # сначала ищем неконечный float в выводе pickle, который пишется кодом
+    # на C. Совпадение внутри строки отсеивает точный обход.
+    try:
+        pickled = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return _walk_non_finite(data)
+    return bool(NON_FINITE_PICKLE.search(pickled)) and _walk_non_finite(
+        data
+    )
+
+
+def _walk_non_finite(data):
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/x-msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True)
@@ -1,17 +1,92 @@
 import base64
 import io
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
 from djoser.serializers import UserSerializer, UserCreateSerializer
 from recipes.models import Ingredient, Recipe, AmountIngredientInRecipe
+from recipes.versions import RECIPE, bump_versions
+from recipes.deletion import delete_files
+from .timing import measure
+from .uploads import assign_after_commit
 from django.conf import settings
-from PIL import Image
 
 User = get_user_model()
 
+# Поля, у которых to_representation возвращает значение атрибута модели
+# без изменений: для них значение берется прямо из объекта.
+PLAIN_FIELDS = {
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+}
+
+
+class DirectRepresentationMixin:
+    # Быстрый to_representation для сериализаторов на чтение. Состав и
+    # порядок полей те же, что у DRF (из Meta.fields), но для простых
+    # полей и SerializerMethodField значения читаются напрямую, без
+    # get_attribute и to_representation поля. Метод represent_<поле>
+    # подменяет вычисление отдельного поля.
+    def get_representation_plan(self):
+        plan = getattr(self, "_representation_plan", None)
+        if plan is not None:
+            return plan
+        plan = []
+        for field in self._readable_fields:
+            custom = getattr(self, f"represent_{field.field_name}", None)
+            if custom is not None:
+                plan.append((field.field_name, "custom", custom))
+            elif isinstance(field, serializers.SerializerMethodField):
+                method = getattr(self, field.method_name)
+                plan.append((field.field_name, "custom", method))
+            elif type(field) in PLAIN_FIELDS and field.source != "*":
+                plan.append((field.field_name, "plain", field.source_attrs))
+            else:
+                plan.append((field.field_name, "field", field))
+        self._representation_plan = plan
+        return plan
+
+    def to_representation(self, instance):
+        # Время уходит в Server-Timing и журнал запросов, вложенные
+        # сериализаторы measure повторно не считает.
+        with measure("serialize"):
+            return self.direct_representation(instance)
+
+    def direct_representation(self, instance):
+        data = {}
+        for name, kind, how in self.get_representation_plan():
+            if kind == "custom":
+                data[name] = how(instance)
+            elif kind == "plain":
+                value = instance
+                for attr in how:
+                    if value is None:
+                        break
+                    value = getattr(value, attr)
+                data[name] = value
+            else:
+                try:
+                    attribute = how.get_attribute(instance)
+                except SkipField:
+                    continue
+                check = (
+                    attribute.pk
+                    if isinstance(attribute, PKOnlyObject)
+                    else attribute
+                )
+                data[name] = (
+                    None if check is None else how.to_representation(attribute)
+                )
+        return data
+
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(DirectRepresentationMixin, UserSerializer):
     avatar = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
@@ -28,6 +103,9 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return request.user.follower.filter(following=obj).exists()
@@ -57,7 +135,9 @@ class CustomUserCreateResponseSerializer(serializers.ModelSerializer):
         fields = ("id", "username", "first_name", "last_name", "email")
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(
+    DirectRepresentationMixin, serializers.ModelSerializer
+):
     measurement_unit = serializers.CharField(
         source="measurment", read_only=True
     )
@@ -68,7 +148,9 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "name", "measurement_unit")
 
 
-class AmountIngredientInRecipeSerializer(serializers.ModelSerializer):
+class AmountIngredientInRecipeSerializer(
+    DirectRepresentationMixin, serializers.ModelSerializer
+):
     id = serializers.ReadOnlyField(source="ingredient.id")
     name = serializers.ReadOnlyField(source="ingredient.name")
     measurement_unit = serializers.ReadOnlyField(
@@ -88,7 +170,18 @@ class RecipeIngredientCreateSerializer(serializers.Serializer):
     )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RELATIONS_MAX_SIZE,
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class RecipeSerializer(DirectRepresentationMixin, serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     ingredients = AmountIngredientInRecipeSerializer(
         source="amountingredientinrecipe_set", many=True, read_only=True
@@ -115,12 +208,18 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
+        is_favorited = getattr(obj, "is_favorited", None)
+        if is_favorited is not None:
+            return is_favorited
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.userfavorite_set.filter(user=request.user).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        is_in_shopping_cart = getattr(obj, "is_in_shopping_cart", None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.wishlist_set.filter(user=request.user).exists()
@@ -159,9 +258,6 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         extra_kwargs = {"author": {"read_only": True}}
     
     def _process_ingredients_in_recipe(self, recipe, ingredients):
-        if hasattr(recipe, 'amountingredientinrecipe_set'):
-            recipe.amountingredientinrecipe_set.all().delete()
-        
         ingredient_objects = []
         for ingredient in ingredients:
             ingredient_objects.append(
@@ -194,41 +290,67 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         if not value:
             raise serializers.ValidationError("Ингредиенты не переданы")
 
-        all_ingredients = set()
-        for ingredient in value:
-            ingredient_id = ingredient["id"]
-            if ingredient_id in all_ingredients:
-                raise serializers.ValidationError("Ингредиент не уникален")
-            all_ingredients.add(ingredient_id)
-
-            if not Ingredient.objects.filter(id=ingredient_id).exists():
-                raise serializers.ValidationError(
-                    f"Ингредиента с {id} id не существует."
-                )
+        ids = [ingredient["id"] for ingredient in value]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Ингредиент не уникален")
+        # Все ингредиенты проверяются одним запросом до любых записей.
+        missing = set(ids) - set(
+            Ingredient.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError(
+                "Ингредиентов с id "
+                f"{', '.join(map(str, sorted(missing)))} не существует."
+            )
 
         return value
 
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients")
-        validated_data["author"] = self.context["request"].user
-        recipe = Recipe.objects.create(**validated_data)
-        self._process_ingredients_in_recipe(recipe, ingredients)
+        image = validated_data.pop("image")
+        recipe = Recipe(author=self.context["request"].user, **validated_data)
+        with transaction.atomic():
+            assign_after_commit(
+                recipe, "image", image, self._restore_image(recipe)
+            )
+            recipe.save()
+            self._process_ingredients_in_recipe(recipe, ingredients)
         return recipe
-    
+
     def update(self, instance, validated_data):
         ingredients = validated_data.pop("ingredients", None)
+        image = validated_data.pop("image", None)
 
-        instance = super().update(instance, validated_data)
-
-        instance.amountingredientinrecipe_set.all().delete()
-        self._process_ingredients_in_recipe(instance, ingredients)
+        with transaction.atomic():
+            if image is not None:
+                assign_after_commit(
+                    instance, "image", image, self._restore_image(instance)
+                )
+            instance = super().update(instance, validated_data)
+            instance.amountingredientinrecipe_set.all().delete()
+            self._process_ingredients_in_recipe(instance, ingredients)
         return instance
 
+    # Файл изображения пишется после коммита. Если запись не удалась,
+    # рецепт остается с прежним изображением, а новый - без изображения.
+    @staticmethod
+    def _restore_image(recipe):
+        def restore(name, previous):
+            restored = Recipe.objects.filter(pk=recipe.pk, image=name).update(
+                image=previous or ""
+            )
+            if restored:
+                bump_versions(RECIPE, [recipe.pk])
+
+        return restore
+
     def to_representation(self, instance):
         return RecipeSerializer(instance, context=self.context).data
 
 
-class RecipeForFollowSerializer(serializers.ModelSerializer):
+class RecipeForFollowSerializer(
+    DirectRepresentationMixin, serializers.ModelSerializer
+):
     cooking_time = serializers.IntegerField(source="cookingTime")
 
     class Meta:
@@ -236,7 +358,9 @@ class RecipeForFollowSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "image", "cooking_time")
 
 
-class FollowUserSerializer(serializers.ModelSerializer):
+class FollowUserSerializer(
+    DirectRepresentationMixin, serializers.ModelSerializer
+):
     avatar = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
     recipes = RecipeForFollowSerializer(many=True, read_only=True)
@@ -257,6 +381,9 @@ class FollowUserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return request.user.follower.filter(following=obj).exists()
@@ -268,10 +395,13 @@ class FollowUserSerializer(serializers.ModelSerializer):
         return None
 
     def get_recipes_count(self, obj):
+        recipes_count = getattr(obj, "recipes_count", None)
+        if recipes_count is not None:
+            return recipes_count
         return obj.recipes.count()
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
+    def represent_recipes(self, instance):
+        recipes = list(instance.recipes.all())
 
         request = self.context.get("request")
         if request:
@@ -279,11 +409,12 @@ class FollowUserSerializer(serializers.ModelSerializer):
             if recipes_limit:
                 try:
                     recipes_limit = int(recipes_limit)
-                    data["recipes"] = data["recipes"][:recipes_limit]
+                    recipes = recipes[:recipes_limit]
                 except (ValueError, TypeError):
                     pass
 
-        return data
+        recipe_field = self.fields["recipes"].child
+        return [recipe_field.to_representation(recipe) for recipe in recipes]
 
 
 class SetPasswordSerializer(serializers.Serializer):
@@ -318,7 +449,11 @@ class AvatarSerializer(serializers.ModelSerializer):
                 image_data = value
             
             decoded_image = base64.b64decode(image_data)
-            
+
+            # Pillow нужен только здесь, не тратим время на его импорт
+            # при старте воркера.
+            from PIL import Image
+
             image = Image.open(io.BytesIO(decoded_image))
             image.verify()
             
@@ -335,8 +470,13 @@ class AvatarSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         decoded_image, image_format = validated_data['avatar']
         filename = f"{instance.id}.{image_format}"
-        instance.image.save(filename, ContentFile(decoded_image))
-        instance.save()
+        previous = instance.image.name
+        instance.image.save(
+            filename, ContentFile(decoded_image), save=False
+        )
+        instance.save(update_fields=["image"])
+        if previous and previous != instance.image.name:
+            delete_files([previous])
         return instance
     
     def to_representation(self, instance):
@@ -0,0 +1,16 @@
+from django.dispatch import receiver
+
+from recipes.versions import RECIPE, versions_bumped
+
+from .documents import BATCH_SIZE, build_documents
+
+
+# Документы рецептов пересобираются после коммита изменения, а не на
+# чтении, но не больше одной пачки за запрос. Изменение автора или
+# ингредиента затрагивает много рецептов: их пересобирает
+# rebuild_recipe_documents --stale в фоне, а до того чтение собирает
+# документ в памяти по новым версиям.
+@receiver(versions_bumped)
+def rebuild_bumped_documents(sender, kind, pks, **kwargs):
+    if kind == RECIPE and len(pks) <= BATCH_SIZE:
+        build_documents(pks)
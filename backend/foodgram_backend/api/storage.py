@@ -0,0 +1,121 @@
+import fcntl
+import hashlib
+import os
+import posixpath
+import tempfile
+import zlib
+from contextlib import contextmanager
+
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+
+from .compression import ENCODINGS, compress
+
+# Расширения статики, для которых collectstatic создает .gz и .br.
+COMPRESSED_STATIC_EXTENSIONS = (
+    ".css", ".js", ".json", ".map", ".svg", ".txt", ".html", ".xml",
+)
+STATIC_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+# Файлы блокировок лежат вне каталогов загрузок, gc_media их не видит.
+LOCK_DIR = ".locks"
+LOCK_STRIPES = 64
+
+
+def content_hash(content):
+    sha = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    content.seek(0)
+    return sha.hexdigest()
+
+
+def hashed_name(name, digest):
+    # recipes/images/photo.JPG -> recipes/images/ab/cd/abcd...ef.jpg
+    directory, filename = posixpath.split(name.replace("\\", "/"))
+    extension = posixpath.splitext(filename)[1].lower()
+    return posixpath.join(directory, digest[:2], digest[2:4], digest + extension)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя зависит только от содержимого и выбирается в _save.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+
+        sha = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in content.chunks():
+                    if not isinstance(chunk, bytes):
+                        chunk = chunk.encode()
+                    sha.update(chunk)
+                    file.write(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+
+            name = hashed_name(name, sha.hexdigest())
+            full_path = self.path(name)
+            with self.lock(name):
+                if os.path.exists(full_path):
+                    os.remove(temp_path)
+                    # Файл снова используется: обновляем mtime, чтобы
+                    # gc_media и delete_files не удалили его в течение
+                    # grace-периода.
+                    os.utime(full_path)
+                    return name
+
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    @contextmanager
+    def lock(self, name):
+        # Блокировка по имени файла, одна на полосу имен. flock действует
+        # между процессами и контейнерами с общим томом media, поэтому
+        # повторная загрузка и удаление файла (recipes.deletion) не
+        # пересекаются.
+        directory = self.path(LOCK_DIR)
+        os.makedirs(directory, exist_ok=True)
+        stripe = zlib.crc32(name.encode()) % LOCK_STRIPES
+        with open(os.path.join(directory, f"{stripe}.lock"), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    # Рядом с файлами статики кладутся сжатые копии для gzip_static
+    # в nginx. Сжимаем с максимальным уровнем: это делается один раз.
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name in paths:
+            if name.endswith(COMPRESSED_STATIC_EXTENSIONS):
+                self.compress_file(name)
+                yield name, name, True
+
+    def compress_file(self, name):
+        with self.open(name) as file:
+            content = file.read()
+        for encoding in ENCODINGS:
+            path = self.path(name + STATIC_SUFFIXES[encoding])
+            compressed = compress(content, encoding)
+            if len(compressed) >= len(content):
+                # Удаляем копию, оставшуюся от прошлой версии файла.
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            with open(path, "wb") as file:
+                file.write(compressed)
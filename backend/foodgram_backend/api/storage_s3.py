@@ -0,0 +1,30 @@
+from botocore.exceptions import ClientError
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+from .storage import content_hash, hashed_name
+
+
+class ContentAddressedS3Storage(S3Storage):
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def exists(self, name):
+        # S3Storage.exists при file_overwrite=True всегда отвечает False, и
+        # повторная загрузка того же содержимого снова шла бы в S3.
+        name = self._normalize_name(clean_name(name))
+        try:
+            self.connection.meta.client.head_object(
+                Bucket=self.bucket_name, Key=name
+            )
+        except ClientError as error:
+            if error.response["ResponseMetadata"]["HTTPStatusCode"] == 404:
+                return False
+            raise
+        return True
+
+    def _save(self, name, content):
+        name = hashed_name(name, content_hash(content))
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from api import catalog
+from recipes.models import Ingredient
+
+from .utils import IsolatedCachesMixin, client_for, create_user
+
+
+class SnapshotFilesTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        override = override_settings(INGREDIENT_SNAPSHOT_ROOT=root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.root = root
+
+    def save(self, version):
+        catalog.save_snapshot(
+            catalog.Snapshot(version, [], {"identity": b"[]"})
+        )
+
+    def versions(self):
+        return sorted(
+            catalog._snapshot_version(filename)
+            for filename in os.listdir(self.root)
+        )
+
+    def test_keeps_previous_versions(self):
+        for version in range(1, 6):
+            self.save(version)
+        self.assertEqual(self.versions(), [3, 4, 5])
+
+    def test_old_version_does_not_delete_newer(self):
+        self.save(5)
+        self.save(4)
+        self.assertEqual(self.versions(), [4, 5])
+
+
+class IngredientListTests(IsolatedCachesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        catalog._snapshot = None
+        self.addCleanup(setattr, catalog, "_snapshot", None)
+        Ingredient.objects.create(id=92001, name="Мука", measurment="г")
+        self.client = client_for(create_user(91001, "reader"))
+
+    def test_list_matches_renderer(self):
+        response = self.client.get("/api/ingredients/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(catalog.get_snapshot().ingredients),
+        )
+        self.assertIn(
+            {"id": 92001, "name": "Мука", "measurement_unit": "г"},
+            response.json(),
+        )
+
+    def test_other_renderers_still_render(self):
+        response = self.client.get(
+            "/api/ingredients/", HTTP_ACCEPT="application/x-msgpack"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-msgpack")
+
+    def test_snapshot_etag_must_match_exactly(self):
+        etag = self.client.get("/api/ingredients/snapshot/")["ETag"]
+        opaque = etag.removeprefix("W/")
+        cases = {
+            etag: 304,
+            opaque: 304,
+            f'"other", {etag}': 304,
+            "*": 304,
+            opaque[:-2] + '"': 200,
+            f"x{etag}": 200,
+            "": 200,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header):
+                response = self.client.get(
+                    "/api/ingredients/snapshot/", HTTP_IF_NONE_MATCH=header
+                )
+                self.assertEqual(response.status_code, expected)
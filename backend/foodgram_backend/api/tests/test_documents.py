@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.documents import stale_recipe_ids
+from recipes.models import Recipe, RecipeDocument
+
+from .utils import IsolatedCachesMixin, client_for, create_catalog
+
+
+class RecipeDocumentTests(IsolatedCachesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author, self.reader = create_catalog()
+        self.client = client_for(self.reader)
+
+    def get(self, pk=93001):
+        return self.client.get(f"/api/recipes/{pk}/")
+
+    def test_missing_recipe(self):
+        self.assertEqual(self.get(99999).status_code, 404)
+        self.assertEqual(self.get("abc").status_code, 404)
+
+    def test_read_does_not_write_document(self):
+        Recipe.objects.filter(pk=93001).update(
+            name="Блины с медом", version=F("version") + 1
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.get()
+        self.assertEqual(response.json()["name"], "Блины с медом")
+        for query in context.captured_queries:
+            self.assertTrue(query["sql"].startswith("SELECT"), query["sql"])
+        self.assertFalse(RecipeDocument.objects.filter(recipe=93001).exists())
+
+    def test_change_rebuilds_document_after_commit(self):
+        recipe = Recipe.objects.get(pk=93001)
+        recipe.name = "Блины с медом"
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        document = RecipeDocument.objects.get(recipe=recipe)
+        self.assertEqual(document.data["name"], "Блины с медом")
+        self.assertEqual(self.get().json()["name"], "Блины с медом")
+
+    def test_author_change_leaves_rebuild_to_worker(self):
+        call_command("rebuild_recipe_documents", stdout=StringIO())
+        self.assertFalse(stale_recipe_ids().exists())
+        self.author.first_name = "Анна"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        stale = set(stale_recipe_ids())
+        self.assertEqual(
+            stale, set(self.author.recipes.values_list("pk", flat=True))
+        )
+        # До пересборки чтение собирает документ в памяти.
+        self.assertEqual(self.get().json()["author"]["first_name"], "Анна")
+
+        call_command("rebuild_recipe_documents", "--stale", stdout=StringIO())
+        self.assertFalse(stale_recipe_ids().exists())
+        for document in RecipeDocument.objects.filter(recipe__in=stale):
+            self.assertEqual(document.data["author"]["first_name"], "Анна")
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class EvictImageCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(IMAGE_CACHE_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def put(self, name, age):
+        path = os.path.join(self.root, "400x300", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"x" * 100)
+        past = time.time() - age
+        os.utime(path, (past, past))
+        return path
+
+    def test_removes_least_recently_used_over_limit(self):
+        oldest = self.put("a.png", age=300)
+        older = self.put("b.png", age=200)
+        newest = self.put("c.png", age=100)
+        out = StringIO()
+        call_command("evict_image_cache", "--max-bytes", "250", stdout=out)
+        self.assertIn("Удалено копий: 1", out.getvalue())
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(older))
+        self.assertTrue(os.path.exists(newest))
+
+    def test_keeps_cache_under_limit(self):
+        path = self.put("a.png", age=100)
+        call_command(
+            "evict_image_cache", "--max-bytes", "1000", stdout=StringIO()
+        )
+        self.assertTrue(os.path.exists(path))
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeScore
+
+from .utils import IsolatedCachesMixin, client_for, create_recipe, create_user
+
+
+class RecipeScorePaginationTests(IsolatedCachesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(91001, "author")
+        # Много рецептов с одинаковой оценкой.
+        popularity = {
+            93001: 5,
+            93002: 0,
+            93003: 5,
+            93004: 0,
+            93005: 0,
+            93006: 2,
+            93007: 0,
+        }
+        for pk in popularity:
+            create_recipe(pk, cls.author, f"Рецепт {pk}", [])
+        for pk, value in popularity.items():
+            RecipeScore.objects.filter(recipe=pk).update(popularity=value)
+        cls.expected = [93003, 93001, 93006, 93007, 93005, 93004, 93002]
+
+    def walk(self, url, link):
+        client = client_for(self.author)
+        pages = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([recipe["id"] for recipe in data["results"]])
+            url = data[link]
+        return pages
+
+    def test_pages_through_ties(self):
+        pages = self.walk("/api/recipes/?ordering=popular&limit=2", "next")
+        self.assertEqual(
+            [pk for page in pages for pk in page], self.expected
+        )
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    def test_previous_links(self):
+        client = client_for(self.author)
+        url = "/api/recipes/?ordering=popular&limit=2"
+        for _ in range(3):
+            url = client.get(url).json()["next"]
+        pages = self.walk(url, "previous")
+        self.assertEqual(
+            [pk for page in reversed(pages) for pk in page], self.expected
+        )
+
+    def test_invalid_cursor(self):
+        response = client_for(self.author).get(
+            "/api/recipes/?ordering=popular&cursor=bm90LWEtY3Vyc29y"
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_orders_by_score_index_columns(self):
+        client = client_for(self.author)
+        with CaptureQueriesContext(connection) as context:
+            client.get("/api/recipes/?ordering=popular&limit=2")
+        sql = next(
+            query["sql"]
+            for query in context.captured_queries
+            if "ORDER BY" in query["sql"] and "recipescore" in query["sql"]
+        )
+        self.assertIn('INNER JOIN "recipes_recipescore"', sql)
+        self.assertNotIn("COALESCE", sql)
+        self.assertIn(
+            'ORDER BY "recipes_recipescore"."popularity" DESC, '
+            '"recipes_recipescore"."recipe_id" DESC',
+            sql,
+        )
@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from api.management.commands.check_queries import ENDPOINTS
+from recipes.models import Ingredient, Recipe
+
+from .utils import (
+    IsolatedCachesMixin,
+    QueryCountMixin,
+    client_for,
+    create_catalog,
+    create_recipe,
+)
+
+
+class NPlusOneTests(QueryCountMixin, IsolatedCachesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = create_catalog()
+        # Лишние рецепты, чтобы запрос на строку повторился больше limit.
+        ingredients = list(Ingredient.objects.filter(pk__gte=92001))
+        for pk in range(93004, 93008):
+            create_recipe(
+                pk, cls.author, f"Рецепт {pk}", [(ingredients[0], 100)]
+            )
+
+    def test_endpoints(self):
+        client = client_for(self.reader)
+        for endpoint in ENDPOINTS:
+            path = endpoint.format(limit=20, recipe=93001)
+            with self.subTest(path=path):
+                with self.assertNoNPlusOne():
+                    response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+
+    def test_detects_repeated_query(self):
+        with self.assertRaisesMessage(AssertionError, "N+1"):
+            with self.assertNoNPlusOne():
+                for recipe in Recipe.objects.all():
+                    recipe.author.username
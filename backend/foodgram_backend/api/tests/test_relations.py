@@ -0,0 +1,127 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from recipes.models import UserFavorite, WishList
+
+from .utils import (
+    IsolatedCachesMixin,
+    QueryCountMixin,
+    client_for,
+    create_catalog,
+    create_recipe,
+    create_user,
+)
+
+
+class ConcurrentFavoriteTests(IsolatedCachesMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(91001, "reader")
+        self.recipe = create_recipe(93001, self.user, "Блины", [])
+        self.url = f"/api/recipes/{self.recipe.pk}/favorite/"
+
+    def race(self, method, threads=2):
+        # Потоки стартуют одновременно и делают один и тот же запрос.
+        barrier = threading.Barrier(threads)
+        statuses = []
+
+        def worker():
+            client = client_for(self.user)
+            try:
+                barrier.wait()
+                response = getattr(client, method)(self.url)
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return Counter(statuses)
+
+    def test_toggle_same_favorite(self):
+        self.assertEqual(self.race("post"), {201: 1, 400: 1})
+        self.assertEqual(
+            UserFavorite.objects.filter(
+                user=self.user, recipe=self.recipe
+            ).count(),
+            1,
+        )
+        self.assertEqual(self.race("delete"), {204: 1, 400: 1})
+        self.assertFalse(UserFavorite.objects.exists())
+
+
+class BulkRelationTests(IsolatedCachesMixin, QueryCountMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author, self.reader = create_catalog()
+        self.client = client_for(self.reader)
+
+    def bulk(self, method, ids, relation="favorite"):
+        response = getattr(self.client, method)(
+            f"/api/recipes/{relation}/bulk/", {"recipes": ids}, "json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return [
+            (result["id"], result["status"])
+            for result in response.json()["results"]
+        ]
+
+    def favorites(self):
+        return set(
+            UserFavorite.objects.filter(user=self.reader).values_list(
+                "recipe_id", flat=True
+            )
+        )
+
+    def test_add_statuses(self):
+        # 99999 не существует: INSERT ... SELECT его пропускает, ошибки
+        # внешнего ключа нет.
+        self.assertEqual(
+            self.bulk("post", [93002, 93001, 93002, 99999]),
+            [(93002, "added"), (93001, "already_added"), (99999, "not_found")],
+        )
+        self.assertEqual(self.favorites(), {93001, 93002})
+
+    def test_remove_statuses(self):
+        self.assertEqual(
+            self.bulk("delete", [93001, 93003, 93001, 99999]),
+            [(93001, "removed"), (93003, "not_added"), (99999, "not_found")],
+        )
+        self.assertEqual(self.favorites(), set())
+
+    def test_shopping_cart(self):
+        self.assertEqual(
+            self.bulk("post", [93002, 93003], relation="shopping_cart"),
+            [(93002, "already_added"), (93003, "added")],
+        )
+        self.assertEqual(
+            set(
+                WishList.objects.filter(user=self.reader).values_list(
+                    "recipe_id", flat=True
+                )
+            ),
+            {93002, 93003},
+        )
+
+    def test_size_limit(self):
+        ids = list(range(1, settings.BULK_RELATIONS_MAX_SIZE + 2))
+        response = self.client.post(
+            "/api/recipes/favorite/bulk/", {"recipes": ids}, "json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.favorites(), {93001})
+
+    def test_two_queries_for_full_batch(self):
+        ids = list(range(93001, 93001 + settings.BULK_RELATIONS_MAX_SIZE))
+        for method in ("post", "delete"):
+            with self.subTest(method=method):
+                with self.assertNumQueries(2), self.assertNoNPlusOne(limit=1):
+                    results = self.bulk(method, ids)
+                self.assertEqual(len(results), len(ids))
@@ -0,0 +1,81 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+
+MSK = datetime.timezone(datetime.timedelta(hours=3))
+# Значения, которые встречаются в ответах API или могут в них попасть.
+PAYLOADS = {
+    "recipe": {
+        "id": 1,
+        "name": "Блины с молоком",
+        "is_favorited": False,
+        "image": None,
+        "ingredients": [
+            {"id": 2, "name": "Мука", "measurement_unit": "г", "amount": 200}
+        ],
+        "text": "Строка с \"кавычками\", \\ и переводом\nстроки",
+    },
+    "datetime_utc": datetime.datetime(
+        2024, 5, 17, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc
+    ),
+    "datetime_offset": datetime.datetime(2024, 5, 17, 8, 30, tzinfo=MSK),
+    "datetime_naive": datetime.datetime(2024, 5, 17, 8, 30, 15, 500),
+    "date": datetime.date(2024, 5, 17),
+    "time": datetime.time(8, 30, 15, 250000),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "decimal": Decimal("12.50"),
+    "floats": [0.1, 2.5, 1500.0, 123456789.123],
+    "big_int": 2 ** 62,
+    "int_keys": {1: "a", 2: "b"},
+    "lazy": gettext_lazy("Рецепт"),
+    "tuple": (1, 2, 3),
+    "empty": {"list": [], "dict": {}, "string": ""},
+    "line_separators": "строка\u2028абзац\u2029конец",
+    # В pickle похоже на неконечный float, но это строка.
+    "float_lookalike": ["G\x7f\U0001f600", None],
+}
+NON_FINITE = (float("nan"), float("inf"), float("-inf"))
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_output_matches_drf_renderer(self):
+        for name, payload in PAYLOADS.items():
+            with self.subTest(name):
+                data = {"value": payload}
+                self.assertEqual(
+                    ORJSONRenderer().render(data),
+                    JSONRenderer().render(data),
+                )
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_non_finite_floats_raise_in_strict_mode(self):
+        for value in NON_FINITE:
+            with self.subTest(value):
+                data = {"value": [None, {"score": value}]}
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    ORJSONRenderer().render(data)
+
+    def test_non_finite_floats_without_strict_mode(self):
+        class LaxJSONRenderer(JSONRenderer):
+            strict = False
+
+        class LaxORJSONRenderer(ORJSONRenderer):
+            strict = False
+
+        for value in NON_FINITE:
+            with self.subTest(value):
+                data = {"value": value, "image": None}
+                self.assertEqual(
+                    LaxORJSONRenderer().render(data),
+                    LaxJSONRenderer().render(data),
+                )
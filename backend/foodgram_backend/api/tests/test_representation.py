@@ -0,0 +1,98 @@
+import json
+import os
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework import serializers
+
+from api.serializers import DirectRepresentationMixin
+from recipes.models import Recipe, RecipeDocument
+
+from .utils import IsolatedCachesMixin, client_for, create_catalog
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "golden"
+ENDPOINTS = {
+    "recipe_list": "/api/recipes/",
+    "recipe_detail": "/api/recipes/93001/",
+    "subscriptions": "/api/users/subscriptions/?recipes_limit=1",
+}
+
+
+def stock_representation():
+    # Стандартный обход полей DRF вместо DirectRepresentationMixin.
+    return mock.patch.object(
+        DirectRepresentationMixin,
+        "to_representation",
+        serializers.Serializer.to_representation,
+    )
+
+
+class RepresentationTests(IsolatedCachesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        _, reader = create_catalog()
+        self.client = client_for(reader)
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def reset(self):
+        # Карточки рецептов строятся сериализатором и кешируются.
+        RecipeDocument.objects.all().delete()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def test_payloads_match_golden_files(self):
+        # UPDATE_GOLDEN=1 перезаписывает эталоны текущими ответами.
+        update = os.getenv("UPDATE_GOLDEN") == "1"
+        for name, path in ENDPOINTS.items():
+            with self.subTest(name):
+                golden = GOLDEN_DIR / f"{name}.json"
+                data = self.get(path)
+                if update:
+                    golden.write_text(
+                        json.dumps(data, ensure_ascii=False, indent=2)
+                        + "\n",
+                        encoding="utf-8",
+                    )
+                    continue
+                expected = json.loads(golden.read_text(encoding="utf-8"))
+                self.assertEqual(data, expected)
+
+    def test_payloads_match_stock_serializers(self):
+        # recipes_limit обрезает список уже после стандартного обхода.
+        paths = [*ENDPOINTS.values(), "/api/users/subscriptions/"]
+        for path in paths:
+            with self.subTest(path):
+                self.reset()
+                with stock_representation():
+                    expected = self.get(path)
+                self.reset()
+                actual = self.get(path)
+                if "recipes_limit" in path:
+                    self.assertEqual(
+                        [len(user["recipes"]) for user in actual["results"]],
+                        [1] * len(actual["results"]),
+                    )
+                    continue
+                self.assertEqual(actual, expected)
+
+    def test_fields_follow_meta(self):
+        class Meta:
+            model = Recipe
+            fields = ("id", "name", "version")
+
+        serializer_class = type(
+            "RecipeVersionSerializer",
+            (DirectRepresentationMixin, serializers.ModelSerializer),
+            {"Meta": Meta},
+        )
+        data = serializer_class(Recipe.objects.get(pk=93001)).data
+        self.assertEqual(
+            data, {"id": 93001, "name": "Блины", "version": 1}
+        )
@@ -0,0 +1,69 @@
+from unittest import mock, skipUnless
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from api.storage import content_hash, hashed_name
+
+try:
+    import boto3
+    from moto import mock_aws
+    from storages.backends.s3 import S3Storage
+
+    from api.storage_s3 import ContentAddressedS3Storage
+except ImportError:
+    mock_aws = None
+
+BUCKET = "foodgram-test"
+
+
+@skipUnless(mock_aws, "нужны moto и django-storages")
+class ContentAddressedS3StorageTests(SimpleTestCase):
+    def setUp(self):
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        credentials = {
+            "aws_access_key_id": "testing",
+            "aws_secret_access_key": "testing",
+            "region_name": "us-east-1",
+        }
+        boto3.client("s3", **credentials).create_bucket(Bucket=BUCKET)
+        self.storage = ContentAddressedS3Storage(
+            bucket_name=BUCKET,
+            access_key="testing",
+            secret_key="testing",
+            region_name="us-east-1",
+            file_overwrite=True,
+        )
+
+    def test_same_content_is_stored_once(self):
+        content = ContentFile(b"soup")
+        expected = hashed_name("recipes/images/a.PNG", content_hash(content))
+        first = self.storage.save("recipes/images/a.PNG", content)
+        second = self.storage.save(
+            "recipes/images/b.png", ContentFile(b"soup")
+        )
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertEqual(
+            [obj.key for obj in self.storage.bucket.objects.all()],
+            [expected],
+        )
+
+    def test_existing_object_is_not_uploaded_again(self):
+        name = self.storage.save("recipes/images/a.png", ContentFile(b"a"))
+        with mock.patch.object(S3Storage, "_save") as upload:
+            self.assertEqual(
+                self.storage.save("recipes/images/b.png", ContentFile(b"a")),
+                name,
+            )
+        upload.assert_not_called()
+
+    def test_exists_and_delete(self):
+        name = self.storage.save("recipes/images/a.png", ContentFile(b"a"))
+        self.assertTrue(self.storage.exists(name))
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b"a")
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
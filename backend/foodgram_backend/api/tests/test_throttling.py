@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.throttling import ActionTokenBucketThrottle, check_throttle_cache
+
+from .utils import IsolatedCachesMixin
+
+RATES = {"recipe.favorite": "2/min"}
+
+
+@override_settings(THROTTLE_ACTION_RATES=RATES)
+class ThrottleTests(IsolatedCachesMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request = APIRequestFactory().post("/api/recipes/1/favorite/")
+        self.request.user = SimpleNamespace(pk=1, is_authenticated=True)
+        self.view = SimpleNamespace(basename="recipe", action="favorite")
+
+    def allow(self):
+        return ActionTokenBucketThrottle().allow_request(
+            self.request, self.view
+        )
+
+    def test_bucket_runs_out(self):
+        self.assertEqual(
+            [self.allow() for _ in range(3)], [True, True, False]
+        )
+
+    def test_busy_lock_denies_request(self):
+        throttle = ActionTokenBucketThrottle()
+        with mock.patch.object(throttle.cache, "add", return_value=False):
+            self.assertFalse(throttle.allow_request(self.request, self.view))
+        self.assertTrue(throttle.wait())
+        # Корзина не тронута: после освобождения блокировки токены есть.
+        self.assertTrue(self.allow())
+
+    def test_file_cache_is_refused(self):
+        caches = {
+            "throttling": {
+                "BACKEND": "django.core.cache.backends.filebased."
+                "FileBasedCache",
+                "LOCATION": "/tmp/foodgram-throttle-test",
+            },
+        }
+        with override_settings(CACHES=caches):
+            with self.assertRaises(ImproperlyConfigured):
+                check_throttle_cache()
@@ -0,0 +1,117 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.queries import inspect_queries
+
+from recipes.models import (
+    AmountIngredientInRecipe,
+    Follow,
+    Ingredient,
+    Recipe,
+    UserFavorite,
+    WishList,
+)
+
+User = get_user_model()
+
+
+class IsolatedCachesMixin:
+    # Каждый тест получает пустые кеши в памяти вместо общих файловых.
+    def setUp(self):
+        super().setUp()
+        override = override_settings(
+            CACHES={
+                alias: {
+                    "BACKEND": "django.core.cache.backends.locmem."
+                    "LocMemCache",
+                    "LOCATION": alias,
+                }
+                for alias in settings.CACHES
+            }
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+
+class QueryCountMixin:
+    # Падает, если один и тот же SQL (с точностью до значений) выполнился
+    # внутри блока больше limit раз - признак N+1.
+    @contextmanager
+    def assertNoNPlusOne(self, limit=2):
+        with inspect_queries(
+            action="warn", limit=limit, slow_ms=0
+        ) as inspector:
+            yield inspector
+        repeated = inspector.repeated()
+        if repeated:
+            lines = []
+            for key, count in repeated.items():
+                lines.append(f"{count} раз: {key}")
+                lines.extend(f"  {line}" for line in inspector.stacks[key])
+            self.fail("Повторяющиеся запросы (N+1):\n" + "\n".join(lines))
+
+
+def create_user(pk, username, **fields):
+    return User.objects.create_user(
+        id=pk,
+        username=username,
+        email=f"{username}@example.com",
+        password="password-123",
+        first_name=fields.pop("first_name", username.title()),
+        last_name=fields.pop("last_name", "Тестов"),
+        **fields,
+    )
+
+
+def create_recipe(pk, author, name, ingredients, **fields):
+    recipe = Recipe.objects.create(
+        id=pk,
+        author=author,
+        name=name,
+        image=fields.pop("image", f"recipes/images/{pk}.png"),
+        description=fields.pop("description", f"Как готовить: {name}."),
+        cookingTime=fields.pop("cookingTime", 15),
+        **fields,
+    )
+    AmountIngredientInRecipe.objects.bulk_create(
+        AmountIngredientInRecipe(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+        for ingredient, amount in ingredients
+    )
+    return recipe
+
+
+def create_catalog():
+    # Небольшой набор данных с фиксированными id для эталонных ответов.
+    author = create_user(
+        91001, "author", image="users/images/ab/cd/avatar.png"
+    )
+    reader = create_user(91002, "reader")
+    flour = Ingredient.objects.create(id=92001, name="Мука", measurment="г")
+    milk = Ingredient.objects.create(id=92002, name="Молоко", measurment="мл")
+    egg = Ingredient.objects.create(id=92003, name="Яйцо", measurment="шт")
+    pancakes = create_recipe(
+        93001, author, "Блины", [(flour, 200), (milk, 500), (egg, 2)]
+    )
+    omelette = create_recipe(
+        93002, author, "Омлет", [(egg, 3), (milk, 50)], cookingTime=10
+    )
+    create_recipe(93003, reader, "Каша", [(milk, 300)], cookingTime=20)
+    Follow.objects.create(user=reader, following=author)
+    UserFavorite.objects.create(user=reader, recipe=pancakes)
+    WishList.objects.create(user=reader, recipe=omelette)
+    return author, reader
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
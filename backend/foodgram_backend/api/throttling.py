@@ -0,0 +1,135 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+LOCK_TIMEOUT = 1
+LOCK_RETRIES = 50
+COUNTER_LOCK_RETRIES = 5
+COUNTER_KEY = "throttle:throttled:{scope}"
+
+
+def get_throttle_cache():
+    if settings.THROTTLE_CACHE_ALIAS in settings.CACHES:
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+    return caches["default"]
+
+
+def check_throttle_cache():
+    # add() и incr() файлового кеша не атомарны между процессами: ни
+    # блокировка корзины, ни счетчики на нем не работают.
+    if settings.THROTTLE_ACTION_RATES and isinstance(
+        get_throttle_cache(), FileBasedCache
+    ):
+        raise ImproperlyConfigured(
+            "Для ограничения частоты запросов нужен кеш с атомарным add(): "
+            "THROTTLE_CACHE_BACKEND=db или redis."
+        )
+
+
+def parse_bucket(config):
+    if isinstance(config, str):
+        config = {"rate": config}
+    num, period = config["rate"].split("/")
+    num = int(num)
+    refill_rate = num / DURATIONS[period[0]]
+    capacity = config.get("burst", num)
+    return capacity, refill_rate
+
+
+def get_throttled_counts():
+    cache = get_throttle_cache()
+    keys = {
+        COUNTER_KEY.format(scope=scope): scope
+        for scope in settings.THROTTLE_ACTION_RATES
+    }
+    values = cache.get_many(keys.keys())
+    return {scope: values.get(key, 0) for key, scope in keys.items()}
+
+
+class ActionTokenBucketThrottle(BaseThrottle):
+    cache_key_format = "throttle:{scope}:{ident}"
+    timer = time.time
+
+    def __init__(self):
+        self.cache = get_throttle_cache()
+        self.wait_time = None
+
+    def get_scope(self, view):
+        basename = getattr(view, "basename", None)
+        action = getattr(view, "action", None)
+        if basename is None or action is None:
+            return None
+        return f"{basename}.{action}"
+
+    def get_cache_key(self, request, scope):
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return self.cache_key_format.format(scope=scope, ident=ident)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        config = settings.THROTTLE_ACTION_RATES.get(scope)
+        if config is None:
+            return True
+
+        capacity, refill_rate = parse_bucket(config)
+        key = self.get_cache_key(request, scope)
+        timeout = int(capacity / refill_rate) + 1
+
+        with self.lock(key, LOCK_RETRIES) as locked:
+            if not locked:
+                # Корзину держит другой запрос слишком долго: без
+                # блокировки ее не изменить, поэтому отказываем.
+                self.wait_time = LOCK_TIMEOUT
+                self.count_throttled(scope)
+                return False
+            now = self.timer()
+            tokens, updated = self.cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.cache.set(key, (tokens, now), timeout)
+
+        if allowed:
+            return True
+
+        self.wait_time = (1 - tokens) / refill_rate
+        self.count_throttled(scope)
+        return False
+
+    @contextmanager
+    def lock(self, key, retries):
+        lock_key = f"{key}:lock"
+        for attempt in range(retries):
+            if self.cache.add(lock_key, 1, LOCK_TIMEOUT):
+                break
+            if attempt + 1 < retries:
+                time.sleep(0.001)
+        else:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self.cache.delete(lock_key)
+
+    def count_throttled(self, scope):
+        # incr() атомарен только в redis, поэтому счетчик тоже меняется
+        # под блокировкой. Если она занята, отказ не учитывается: это
+        # только статистика.
+        key = COUNTER_KEY.format(scope=scope)
+        with self.lock(key, COUNTER_LOCK_RETRIES) as locked:
+            if locked:
+                self.cache.set(key, self.cache.get(key, 0) + 1, None)
+
+    def wait(self):
+        return self.wait_time
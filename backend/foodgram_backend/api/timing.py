@@ -0,0 +1,77 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = {"db": 0.0, "serialize": 0.0, "render": 0.0}
+        self.queries = 0
+        self.depth = 0
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add("db", time.perf_counter() - start)
+            self.queries += 1
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def milliseconds(self):
+        return {
+            name: round(seconds * 1000, 2)
+            for name, seconds in self.durations.items()
+        }
+
+    def server_timing(self):
+        # Интервалы пересекаются: db входит и в serialize, и в total.
+        ms = self.milliseconds()
+        return ", ".join(
+            (
+                f'db;dur={ms["db"]};desc="{self.queries} queries"',
+                f"serialize;dur={ms['serialize']}",
+                f"render;dur={ms['render']}",
+                f"total;dur={round(self.total() * 1000, 2)}",
+            )
+        )
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def track_request():
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure(name):
+    timings = current_timings()
+    # Вложенные замеры (сериализатор внутри сериализатора) не
+    # складываются дважды.
+    if timings is None or timings.depth:
+        yield
+        return
+    timings.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.depth -= 1
+        timings.add(name, time.perf_counter() - start)
+
@@ -0,0 +1,75 @@
+import json
+import logging
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+MASS_UNIT = "г"
+VOLUME_UNIT = "мл"
+
+
+@lru_cache(maxsize=1)
+def load_units_table():
+    try:
+        with open(settings.UNITS_DATA_PATH, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        # Без таблицы список покупок собирается без пересчета единиц.
+        logger.error(
+            "Не найдена таблица единиц измерения: %s",
+            settings.UNITS_DATA_PATH,
+        )
+        return {}, {}
+    units = {
+        unit: (value["base"], value["factor"])
+        for unit, value in data.get("units", {}).items()
+    }
+    return units, data.get("densities", {})
+
+
+def _to_canonical(measurment, amount, units):
+    if measurment in units:
+        base, factor = units[measurment]
+        return base, amount * factor
+    return measurment, amount
+
+
+def aggregate_ingredients(rows):
+    units, densities = load_units_table()
+
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row["ingredient__name"]].append(
+            (row["ingredient__measurment"], row["amount"])
+        )
+
+    result = []
+    for name in sorted(grouped):
+        items = grouped[name]
+        if len({measurment for measurment, _ in items}) == 1:
+            measurment = items[0][0]
+            result.append((name, measurment, sum(a for _, a in items)))
+            continue
+
+        totals = defaultdict(float)
+        for measurment, amount in items:
+            unit, value = _to_canonical(measurment, amount, units)
+            totals[unit] += value
+
+        density = densities.get(name)
+        if density and MASS_UNIT in totals and VOLUME_UNIT in totals:
+            totals[MASS_UNIT] += totals.pop(VOLUME_UNIT) * density
+
+        for unit, value in totals.items():
+            result.append((name, unit, value))
+
+    return result
+
+
+def format_amount(amount):
+    amount = round(amount, 1)
+    if float(amount).is_integer():
+        return str(int(amount))
+    return str(amount)
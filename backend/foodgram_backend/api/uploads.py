@@ -0,0 +1,55 @@
+import logging
+
+from django.db import transaction
+
+from recipes.deletion import delete_files
+
+from .storage import content_hash, hashed_name
+
+logger = logging.getLogger(__name__)
+
+
+def assign_after_commit(instance, field_name, content, on_failure):
+    # Хранилище адресует файлы по содержимому, поэтому итоговое имя
+    # известно до записи. В строку попадает только имя, а сам файл
+    # пишется после коммита: откат транзакции не оставляет сирот.
+    #
+    # Если запись файла после коммита не удалась, строка уже сохранена:
+    # ошибка пишется в лог, on_failure(name, previous) возвращает в базе
+    # прежнее значение поля, и запрос завершается успешно с ним. Если
+    # коммит происходит раньше ответа (транзакция не вложена во внешнюю),
+    # ответ тоже показывает прежнее значение.
+    field = instance._meta.get_field(field_name)
+    base_name = field.generate_filename(instance, content.name)
+    name = hashed_name(base_name, content_hash(content))
+    previous = getattr(instance, field_name).name or None
+    setattr(instance, field_name, name)
+
+    def write():
+        try:
+            stored = field.storage.save(base_name, content)
+        except Exception:
+            logger.exception(
+                "Не удалось записать файл %s, оставлено прежнее значение",
+                name,
+                extra={
+                    "model": instance._meta.label,
+                    "pk": instance.pk,
+                    "field": field_name,
+                    "previous": previous,
+                },
+            )
+            on_failure(name, previous)
+            setattr(instance, field_name, previous)
+            return
+        if stored != name:
+            # Хранилище без адресации по содержимому: исправляем ссылку.
+            type(instance).objects.filter(
+                pk=instance.pk, **{field_name: name}
+            ).update(**{field_name: stored})
+            setattr(instance, field_name, stored)
+        if previous and previous != stored:
+            delete_files([previous])
+
+    transaction.on_commit(write)
+    return name
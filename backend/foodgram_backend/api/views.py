@@ -9,6 +9,7 @@ from .serializers import (
     RecipeCreateSerializer,
     FollowUserSerializer,
     RecipeForFollowSerializer,
+    RecipeIdsSerializer,
     SetPasswordSerializer,
     CustomUserCreateResponseSerializer,
     AvatarSerializer,
@@ -22,7 +23,7 @@ from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
     AllowAny,
 )
-from .pagination import CustomUserPagination
+from .pagination import CustomUserPagination, RecipeScorePagination
 from recipes.models import (
     Ingredient,
     Recipe,
@@ -32,18 +33,68 @@ from recipes.models import (
     AmountIngredientInRecipe,
 )
 from .permissions import OwnerOrReadOnly, ReadOnly
-from .filters import RecipeFilter
+from .filters import RecipeFilter, UserFilter
+from recipes import graph
+from foodgram_backend.cache import get_cache
+from foodgram_backend.images import (
+    VariantNotAvailable,
+    content_type,
+    get_variant,
+)
+from recipes.deletion import (
+    delete_files,
+    delete_recipes,
+    schedule_user_deletion,
+)
+from .units import aggregate_ingredients, format_amount
+from .catalog import current_version, get_changes, get_snapshot
+from .compression import choose_encoding
+from .documents import get_document, merge_viewer_flags, schedule_rebuild
+from .relations import (
+    delete_returning,
+    insert_for_existing,
+    insert_ignore_conflicts,
+)
+from .renderers import ORJSONRenderer
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Sum
-from hashids import Hashids
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+)
+from django.db import DatabaseError, connection
+from django.db.models import Count, Exists, OuterRef, Prefetch, Sum
+from functools import lru_cache
+from urllib.parse import quote
 from django.shortcuts import redirect
+from django.utils.http import parse_etags
 
 
 User = get_user_model()
 
 
+def etag_matches(etag, if_none_match):
+    # Слабое сравнение, как требует RFC 9110 для If-None-Match: значения
+    # сверяются целиком, а не поиском подстроки в заголовке.
+    etags = parse_etags(if_none_match)
+    if "*" in etags:
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(value.removeprefix("W/") == opaque for value in etags)
+
+
+@lru_cache(maxsize=None)
+def get_hashids():
+    # hashids нужен только для коротких ссылок, поэтому импортируется
+    # при первом обращении.
+    from hashids import Hashids
+
+    return Hashids(salt="Testing_salt", min_length=4)
+
+
 class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
 
@@ -60,6 +111,22 @@ class CustomUserViewSet(UserViewSet):
         return [AllowAny()]
 
     pagination_class = CustomUserPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = UserFilter
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action in ("list", "retrieve") and user.is_authenticated:
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    Follow.objects.filter(user=user, following=OuterRef("pk"))
+                )
+            )
+        return queryset
+
+    def perform_destroy(self, instance):
+        schedule_user_deletion(instance)
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
@@ -111,8 +178,10 @@ class CustomUserViewSet(UserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             
-            user.image.delete()
-            user.save()
+            image = user.image.name
+            user.image = None
+            user.save(update_fields=["image"])
+            delete_files([image])
             
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -123,9 +192,19 @@ class CustomUserViewSet(UserViewSet):
                 {"detail": "Учетные данные не были предоставлены."},
                 status=status.HTTP_401_UNAUTHORIZED,
             )
-        queryset = User.objects.filter(
-            following__user=request.user
-        ).distinct()
+        queryset = (
+            User.objects.filter(following__user=request.user)
+            .annotate(
+                is_subscribed=Exists(
+                    Follow.objects.filter(
+                        user=request.user, following=OuterRef("pk")
+                    )
+                ),
+                recipes_count=Count("recipes", distinct=True),
+            )
+            .prefetch_related("recipes")
+            .distinct()
+        )
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -139,6 +218,54 @@ class CustomUserViewSet(UserViewSet):
         )
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"])
+    def followers(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {"detail": "Учетные данные не были предоставлены."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        return self.graph_response(graph.followers(request.user.pk))
+
+    @action(detail=False, methods=["get"])
+    def mutual(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {"detail": "Учетные данные не были предоставлены."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        return self.graph_response(graph.get_mutual(request.user.pk))
+
+    @action(detail=False, methods=["get"])
+    def suggestions(self, request):
+        if not request.user.is_authenticated:
+            return Response(
+                {"detail": "Учетные данные не были предоставлены."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        try:
+            limit = int(request.query_params.get("limit", 0))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= settings.SOCIAL_GRAPH_SUGGESTIONS:
+            limit = settings.SOCIAL_GRAPH_SUGGESTIONS
+        return self.graph_response(
+            graph.get_suggestions(request.user.pk, limit), paginate=False
+        )
+
+    def graph_response(self, queryset, paginate=True):
+        queryset = queryset.annotate(
+            is_subscribed=Exists(
+                graph.follows(self.request.user.pk, OuterRef("pk"))
+            )
+        )
+        page = self.paginate_queryset(queryset) if paginate else None
+        if page is not None:
+            serializer = CustomUserSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = CustomUserSerializer(queryset, many=True)
+        return Response(serializer.data)
+
     @action(detail=True, methods=["post", "delete"])
     def subscribe(self, request, id):
 
@@ -157,35 +284,34 @@ class CustomUserViewSet(UserViewSet):
             )
 
         if request.method == "POST":
-            if request.user.follower.filter(following=for_follow_user).exists():
+            # Создаем подписку, повторная подписка ничего не вставит
+            created = insert_ignore_conflicts(
+                Follow, [Follow(user=request.user, following=for_follow_user)]
+            )
+            graph.forget_adjacency(request.user.pk, for_follow_user.pk)
+            if not created:
                 return Response(
                     {"detail": "Вы уже подписаны на этого пользователя."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        
-            # Создаем подписку
-            Follow.objects.create(
-                user=request.user, 
-                following=for_follow_user
-            )
-            
+
+            for_follow_user.is_subscribed = True
             serializer = FollowUserSerializer(
                 for_follow_user, context={"request": request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         elif request.method == "DELETE":
-            try:
-                follow = Follow.objects.get(
-                    user=request.user, following=for_follow_user
-                )
-                follow.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            except Follow.DoesNotExist:
+            deleted, _ = Follow.objects.filter(
+                user=request.user, following=for_follow_user
+            ).delete()
+            graph.forget_adjacency(request.user.pk, for_follow_user.pk)
+            if not deleted:
                 return Response(
                     {"detail": "Вы не подписаны на пользователя."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=["post"])
     def set_password(self, request):
@@ -205,7 +331,7 @@ class CustomUserViewSet(UserViewSet):
         user = request.user
         new_password = serializer.validated_data["new_password"]
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=["password"])
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -227,6 +353,69 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset.order_by("name")
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if not name:
+            # Полный каталог уже сериализован в снимке текущей версии, а
+            # для JSON без отступов - и закодирован.
+            snapshot = get_snapshot()
+            renderer = request.accepted_renderer
+            if isinstance(renderer, ORJSONRenderer) and not (
+                renderer.get_indent(request.accepted_media_type, {})
+            ):
+                return HttpResponse(
+                    snapshot.list_body, content_type=renderer.media_type
+                )
+            return Response(snapshot.ingredients)
+        # Версия каталога в ключе: после изменения каталога старые
+        # результаты поиска просто перестают запрашиваться.
+        key = f"search:{current_version()}:{name.lower()}"
+        return Response(
+            get_cache("ingredients").get_or_set(
+                key,
+                lambda: self.get_serializer(
+                    self.get_queryset(), many=True
+                ).data,
+            )
+        )
+
+    @action(detail=False, methods=["get"])
+    def snapshot(self, request):
+        snapshot = get_snapshot()
+        if etag_matches(
+            snapshot.etag, request.headers.get("If-None-Match", "")
+        ):
+            response = HttpResponseNotModified()
+        else:
+            encoding = choose_encoding(
+                request.headers.get("Accept-Encoding", ""), snapshot.bodies
+            )
+            response = HttpResponse(
+                snapshot.bodies[encoding], content_type="application/json"
+            )
+            if encoding != "identity":
+                response["Content-Encoding"] = encoding
+        response["ETag"] = snapshot.etag
+        response["Vary"] = "Accept-Encoding"
+        response["Cache-Control"] = "public, no-cache"
+        return response
+
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        since = request.query_params.get("since", "")
+        if not since.isdigit():
+            return Response(
+                {"since": "Укажите версию каталога целым числом."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        changes = get_changes(int(since))
+        if changes["since"] > changes["version"]:
+            return Response(
+                {"since": "Версия больше текущей версии каталога."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(changes)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
@@ -246,9 +435,75 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.hashids = Hashids(salt="Testing_salt", min_length=4)
+    def get_score_ordering(self):
+        ordering = self.request.query_params.get("ordering")
+        if (
+            self.action == "list"
+            and ordering in RecipeScorePagination.orderings
+        ):
+            return ordering
+        return None
+
+    @property
+    def paginator(self):
+        if self.get_score_ordering() is not None:
+            self.pagination_class = RecipeScorePagination
+        return super().paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Для retrieve данные берутся из документа рецепта.
+        if self.action != "list":
+            return queryset
+
+        if self.get_score_ordering() is not None:
+            # Строку оценок гарантируют сигнал create_recipe_score и
+            # миграция 0005, поэтому соединение внутреннее, и порядок
+            # страниц берется из индексов RecipeScore.
+            queryset = queryset.filter(score__isnull=False).select_related(
+                "score"
+            )
+
+        user = self.request.user
+        authors = User.objects.all()
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                "amountingredientinrecipe_set",
+                queryset=AmountIngredientInRecipe.objects.select_related(
+                    "ingredient"
+                ),
+            )
+        )
+        if user.is_authenticated:
+            authors = authors.annotate(
+                is_subscribed=Exists(
+                    Follow.objects.filter(user=user, following=OuterRef("pk"))
+                )
+            )
+            queryset = queryset.annotate(
+                is_favorited=Exists(
+                    UserFavorite.objects.filter(
+                        user=user, recipe=OuterRef("pk")
+                    )
+                ),
+                is_in_shopping_cart=Exists(
+                    WishList.objects.filter(user=user, recipe=OuterRef("pk"))
+                ),
+            )
+        return queryset.prefetch_related(Prefetch("author", queryset=authors))
+
+    def retrieve(self, request, *args, **kwargs):
+        # Права и 404 проверяет get_object. Представление рецепта берется
+        # из RecipeDocument, запросом к базе добавляются только флаги
+        # текущего пользователя.
+        recipe = self.get_object()
+        return Response(
+            merge_viewer_flags(get_document(recipe.pk), request.user)
+        )
+
+    def perform_create(self, serializer):
+        serializer.save()
+        schedule_rebuild([serializer.instance.pk])
 
     @action(detail=True, methods=["post", "delete"])
     def favorite(self, request, pk):
@@ -258,35 +513,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        for_favorite_recipe = get_object_or_404(Recipe, pk=pk)
-
         if request.method == "POST":
-            if request.user.userfavorite_set.filter(recipe=for_favorite_recipe).exists():
+            for_favorite_recipe = get_object_or_404(Recipe, pk=pk)
+            created = insert_ignore_conflicts(
+                UserFavorite,
+                [UserFavorite(user=request.user, recipe=for_favorite_recipe)],
+            )
+            if not created:
                 return Response(
                     {"detail": "Вы уже добавили этот рецепт в избранное."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            else:
-                UserFavorite.objects.create(
-                    user=request.user, recipe=for_favorite_recipe
-                )
             serializer = RecipeForFollowSerializer(
                 for_favorite_recipe, context={"request": request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         elif request.method == "DELETE":
-            try:
-                userFavorite = UserFavorite.objects.get(
-                    user=request.user, recipe=for_favorite_recipe
-                )
-                userFavorite.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            except UserFavorite.DoesNotExist:
+            deleted, _ = UserFavorite.objects.filter(
+                user=request.user, recipe_id=pk
+            ).delete()
+            if not deleted:
+                get_object_or_404(Recipe, pk=pk)
                 return Response(
                     {"detail": "Вы не добавляли этот рецепт в избранное"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=["post", "delete"])
     def shopping_cart(self, request, pk):
@@ -297,36 +550,90 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
 
         if request.method == "POST":
-            if request.user.wishlist_set.filter(recipe=pk).exists():
+            for_shopping_cart_recipe = get_object_or_404(Recipe, pk=pk)
+            created = insert_ignore_conflicts(
+                WishList,
+                [WishList(user=request.user, recipe=for_shopping_cart_recipe)],
+            )
+            if not created:
                 return Response(
                     {
                         "detail": "Вы уже добавили этот рецепт в список."
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            else:
-                for_shopping_cart_recipe = get_object_or_404(Recipe, pk=pk)
-                WishList.objects.create(
-                    user=request.user, recipe=for_shopping_cart_recipe
-                )
             serializer = RecipeForFollowSerializer(
                 for_shopping_cart_recipe, context={"request": request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         elif request.method == "DELETE":
-            for_shopping_cart_recipe = get_object_or_404(Recipe, pk=pk)
-            try:
-                wish = WishList.objects.get(
-                    user=request.user, recipe=for_shopping_cart_recipe
-                )
-                wish.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            except WishList.DoesNotExist:
+            deleted, _ = WishList.objects.filter(
+                user=request.user, recipe_id=pk
+            ).delete()
+            if not deleted:
+                get_object_or_404(Recipe, pk=pk)
                 return Response(
                     {"detail": "Вы не добавляли этот рецепт в избранное"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_destroy(self, instance):
+        delete_recipes([instance.pk])
+
+    def _bulk_relation(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data["recipes"]
+
+        # Изменение идет первым: рецепт, удаленный до него, не попадет во
+        # вставку и ниже окажется not_found, а не ошибкой внешнего ключа.
+        if request.method == "POST":
+            changed = insert_for_existing(
+                model, model(user=request.user), "recipe", recipe_ids
+            )
+            outcomes = ("added", "already_added")
+        else:
+            changed = delete_returning(
+                model, "recipe", user=request.user.pk, recipe__in=recipe_ids
+            )
+            outcomes = ("removed", "not_added")
+        existing = set(
+            Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                "pk", flat=True
+            )
+        )
+
+        changed = set(changed)
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id in changed:
+                outcome = outcomes[0]
+            elif recipe_id not in existing:
+                outcome = "not_found"
+            else:
+                outcome = outcomes[1]
+            results.append({"id": recipe_id, "status": outcome})
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="favorite/bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_bulk(self, request):
+        return self._bulk_relation(request, UserFavorite)
+
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="shopping_cart/bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request):
+        return self._bulk_relation(request, WishList)
 
     @action(detail=False, methods=["get"])
     def download_shopping_cart(self, request):
@@ -356,11 +663,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
             " " * 50,
         ]
 
-        for item in ingredients:
-            name = item["ingredient__name"]
-            measurment = item["ingredient__measurment"]
-            amount = item["amount"]
-            content_lines.append(f"• {name} ({measurment}) — {amount}")
+        for name, measurment, amount in aggregate_ingredients(ingredients):
+            content_lines.append(
+                f"• {name} ({measurment}) — {format_amount(amount)}"
+            )
 
         content = "\n".join(content_lines)
 
@@ -372,6 +678,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return response
 
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[AllowAny],
+    )
+    def similar(self, request, pk=None):
+        recipes = list(
+            Recipe.objects.filter(similar_to__recipe_id=pk).order_by(
+                "-similar_to__score", "id"
+            )
+        )
+        if not recipes:
+            get_object_or_404(Recipe, pk=pk)
+        serializer = RecipeForFollowSerializer(
+            recipes, many=True, context={"request": request}
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=["get"],
@@ -391,7 +715,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_short_link(self, request, pk=None):
         instance = self.get_object()
-        hashid = self.hashids.encode(instance.id)
+        hashid = get_hashids().encode(instance.id)
         short_link = request.build_absolute_uri(f"/s/{hashid}/")
         return Response({"short-link": short_link})
 
@@ -399,13 +723,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
 class RedirectFromShortView(APIView):
     permission_classes = (AllowAny,)
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.hashids = Hashids(salt="Testing_salt", min_length=4)
-
     def get(self, request, hashed):
         try:
-            decoded_id = self.hashids.decode(hashed)
+            decoded_id = get_hashids().decode(hashed)
             if not decoded_id:
                 raise ValueError
             recipe_id = decoded_id[0]
@@ -418,3 +738,46 @@ class RedirectFromShortView(APIView):
                 {"detail": "Короткая ссылка повреждена"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+
+class ResizedImageView(APIView):
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request, width, height, path):
+        try:
+            variant = get_variant(path, width, height)
+        except VariantNotAvailable:
+            raise Http404
+
+        if settings.IMAGE_ACCEL_REDIRECT_PREFIX:
+            # Файл отдает nginx, приложение только выбирает вариант.
+            response = HttpResponse(content_type=content_type(variant))
+            response["X-Accel-Redirect"] = (
+                f"{settings.IMAGE_ACCEL_REDIRECT_PREFIX}"
+                f"{width}x{height}/{quote(path)}"
+            )
+        else:
+            response = FileResponse(
+                open(variant, "rb"), content_type=content_type(variant)
+            )
+        response["Cache-Control"] = settings.MEDIA_CACHE_CONTROL
+        return response
+
+
+class HealthView(APIView):
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    throttle_classes = ()
+
+    def get(self, request):
+        # Воркер готов принимать запросы, если доступна база данных.
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError:
+            return Response(
+                {"status": "unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response({"status": "ok"})
@@ -0,0 +1,278 @@
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+MISSING = object()
+# Сколько ждать, пока другой процесс вычисляет значение.
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+STATS_FLUSH_INTERVAL = 10
+STATS_KEY = "stats:{stat}"
+STATS = (
+    "local_hits",
+    "local_misses",
+    "shared_hits",
+    "shared_misses",
+    "computes",
+    "early_computes",
+    "lock_waits",
+)
+
+
+class LocalLRU:
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return MISSING
+            value, expires = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return MISSING
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + timeout)
+            self.data.move_to_end(key)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TieredCache:
+    # Небольшой LRU в памяти процесса перед общим кешем Django. Локальная
+    # копия живет не дольше LOCAL_TIMEOUT, поэтому delete() в одном
+    # процессе до остальных доходит с такой задержкой.
+    def __init__(self, name, timeout, local_size, local_timeout, beta=1.0):
+        self.name = name
+        self.timeout = timeout
+        self.beta = beta
+        self.shared = caches[name]
+        self.local = LocalLRU(local_size, local_timeout)
+        self.counts = Counter()
+        self.counts_lock = threading.Lock()
+        self.flushed = time.monotonic()
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not MISSING:
+            self.record("local_hits")
+            return value
+        self.record("local_misses")
+        entry = self.shared.get(key)
+        if entry is None:
+            self.record("shared_misses")
+            return default
+        self.record("shared_hits")
+        value, _, expires = entry
+        self.local.set(key, value, expires - time.time())
+        return value
+
+    def set(self, key, value, timeout=None, compute_time=0):
+        timeout = timeout or self.timeout
+        # Вместе со значением храним время вычисления и момент истечения
+        # для вероятностного раннего обновления.
+        self.shared.set(
+            key, (value, compute_time, time.time() + timeout), timeout
+        )
+        self.local.set(key, value, timeout)
+
+    def get_many(self, keys):
+        # Найденные значения по ключам; отсутствующих ключей в ответе нет.
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is MISSING:
+                self.record("local_misses")
+                missing.append(key)
+            else:
+                self.record("local_hits")
+                found[key] = value
+        if not missing:
+            return found
+        entries = self.shared.get_many(missing)
+        for key in missing:
+            entry = entries.get(key)
+            if entry is None:
+                self.record("shared_misses")
+                continue
+            self.record("shared_hits")
+            value, _, expires = entry
+            self.local.set(key, value, expires - time.time())
+            found[key] = value
+        return found
+
+    def set_many(self, data, timeout=None):
+        timeout = timeout or self.timeout
+        expires = time.time() + timeout
+        self.shared.set_many(
+            {key: (value, 0, expires) for key, value in data.items()},
+            timeout,
+        )
+        for key, value in data.items():
+            self.local.set(key, value, timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def get_or_set(self, key, compute, timeout=None):
+        value = self.local.get(key)
+        if value is not MISSING:
+            self.record("local_hits")
+            return value
+        self.record("local_misses")
+
+        entry = self.shared.get(key)
+        if entry is not None:
+            self.record("shared_hits")
+            value, compute_time, expires = entry
+            if not self.should_refresh(compute_time, expires):
+                self.local.set(key, value, expires - time.time())
+                return value
+            # Значение скоро истечет: пересчитывает один процесс,
+            # остальные пока отдают текущее.
+            if self.acquire(key):
+                self.record("early_computes")
+                try:
+                    return self.compute(key, compute, timeout)
+                finally:
+                    self.release(key)
+            return value
+
+        self.record("shared_misses")
+        if not self.acquire(key):
+            self.record("lock_waits")
+            entry = self.wait(key)
+            if entry is not None:
+                value, _, expires = entry
+                self.local.set(key, value, expires - time.time())
+                return value
+            return self.compute(key, compute, timeout)
+        try:
+            return self.compute(key, compute, timeout)
+        finally:
+            self.release(key)
+
+    def should_refresh(self, compute_time, expires):
+        # XFetch: чем дольше считается значение и чем ближе истечение,
+        # тем вероятнее досрочный пересчет.
+        jitter = -compute_time * self.beta * math.log(1 - random.random())
+        return time.time() + jitter >= expires
+
+    def compute(self, key, compute, timeout):
+        self.record("computes")
+        start = time.monotonic()
+        value = compute()
+        self.set(key, value, timeout, time.monotonic() - start)
+        return value
+
+    def acquire(self, key):
+        return self.shared.add(f"lock:{key}", 1, LOCK_TIMEOUT)
+
+    def release(self, key):
+        self.shared.delete(f"lock:{key}")
+
+    def wait(self, key):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = self.shared.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def record(self, stat):
+        with self.counts_lock:
+            self.counts[stat] += 1
+            if time.monotonic() - self.flushed < STATS_FLUSH_INTERVAL:
+                return
+            counts, self.counts = self.counts, Counter()
+            self.flushed = time.monotonic()
+        self.flush_stats(counts)
+
+    def flush_stats(self, counts=None):
+        if counts is None:
+            with self.counts_lock:
+                counts, self.counts = self.counts, Counter()
+        for stat, count in counts.items():
+            key = STATS_KEY.format(stat=stat)
+            self.shared.add(key, 0, None)
+            self.shared.incr(key, count)
+
+    def stats(self):
+        self.flush_stats()
+        keys = {STATS_KEY.format(stat=stat): stat for stat in STATS}
+        values = self.shared.get_many(keys.keys())
+        counts = {stat: values.get(key, 0) for key, stat in keys.items()}
+        counts["local_hit_ratio"] = hit_ratio(
+            counts["local_hits"], counts["local_misses"]
+        )
+        counts["shared_hit_ratio"] = hit_ratio(
+            counts["shared_hits"], counts["shared_misses"]
+        )
+        return counts
+
+
+def hit_ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+_tiered_caches = {}
+_tiered_caches_lock = threading.Lock()
+
+
+def get_cache(name):
+    cache = _tiered_caches.get(name)
+    if cache is not None:
+        return cache
+    with _tiered_caches_lock:
+        if name not in _tiered_caches:
+            config = settings.TIERED_CACHES[name]
+            _tiered_caches[name] = TieredCache(
+                name,
+                timeout=config["TIMEOUT"],
+                local_size=config["LOCAL_SIZE"],
+                local_timeout=config["LOCAL_TIMEOUT"],
+                beta=config.get("BETA", 1.0),
+            )
+        return _tiered_caches[name]
+
+
+@receiver(setting_changed)
+def reset_tiered_caches(setting, **kwargs):
+    # Тесты подменяют CACHES: именованные кеши создаются заново.
+    if setting in ("CACHES", "TIERED_CACHES"):
+        with _tiered_caches_lock:
+            _tiered_caches.clear()
+
+
+def cache_stats():
+    return {name: get_cache(name).stats() for name in settings.TIERED_CACHES}
+
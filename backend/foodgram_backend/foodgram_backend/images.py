@@ -0,0 +1,174 @@
+import fcntl
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.utils._os import safe_join
+
+LOCK_STRIPES = 64
+# Доля лимита, до которой очищается кеш после переполнения.
+EVICT_TO = 0.9
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 85},
+}
+
+
+class VariantNotAvailable(Exception):
+    pass
+
+
+def variant_path(width, height, name):
+    try:
+        return safe_join(settings.IMAGE_CACHE_ROOT, f"{width}x{height}", name)
+    except SuspiciousFileOperation:
+        raise VariantNotAvailable(name)
+
+
+def _lock_path(key):
+    stripe = int(hashlib.md5(key.encode()).hexdigest(), 16) % LOCK_STRIPES
+    return os.path.join(settings.IMAGE_CACHE_ROOT, ".locks", f"{stripe}.lock")
+
+
+class _FileLock:
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self.file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, "a")
+        flags = fcntl.LOCK_EX
+        if not self.blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self.file, flags)
+        except BlockingIOError:
+            self.file.close()
+            self.file = None
+        return self.file is not None
+
+    def __exit__(self, *exc_info):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+
+
+def render_variant(name, target, width, height):
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    if not default_storage.exists(name):
+        raise VariantNotAvailable(name)
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".render-")
+    try:
+        with (
+            os.fdopen(fd, "wb") as file,
+            default_storage.open(name) as source,
+            Image.open(source) as image,
+        ):
+            image_format = image.format
+            # Для JPEG декодер сразу уменьшает изображение в 2-8 раз.
+            image.draft("RGB", (width, height))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, height), Image.Resampling.LANCZOS)
+            if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(
+                file, image_format, **SAVE_OPTIONS.get(image_format, {})
+            )
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, target)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise VariantNotAvailable(name)
+
+
+def get_variant(name, width, height):
+    if (width, height) not in settings.IMAGE_RESIZE_SIZES:
+        raise VariantNotAvailable(name)
+    target = variant_path(width, height, name)
+    if _touch(target):
+        return target
+
+    # Одновременные промахи по одному варианту ждут первого рендера.
+    with _FileLock(_lock_path(target)):
+        if not os.path.exists(target):
+            render_variant(name, target, width, height)
+    return target
+
+
+def _touch(path):
+    # mtime служит временем последнего обращения; обновляем его не чаще
+    # раза в IMAGE_CACHE_TOUCH_INTERVAL, чтобы не писать на диск на
+    # каждый запрос.
+    try:
+        modified = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False
+    if time.time() - modified > settings.IMAGE_CACHE_TOUCH_INTERVAL:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def _cached_files():
+    for root, dirs, files in os.walk(settings.IMAGE_CACHE_ROOT):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for filename in files:
+            if filename.startswith("."):
+                continue
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+
+# Обход всего кеша не для запроса: размер держит команда
+# evict_image_cache, запущенная по расписанию или с --interval.
+def evict_variants(max_bytes=None):
+    max_bytes = max_bytes or settings.IMAGE_CACHE_MAX_BYTES
+    lock = os.path.join(settings.IMAGE_CACHE_ROOT, ".locks", "evict.lock")
+    with _FileLock(lock, blocking=False) as locked:
+        if not locked:
+            return 0
+        files = list(_cached_files())
+        total = sum(size for _, size, _ in files)
+        if total <= max_bytes:
+            return 0
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+def delete_variants(name):
+    for width, height in settings.IMAGE_RESIZE_SIZES:
+        try:
+            os.remove(variant_path(width, height, name))
+        except (FileNotFoundError, VariantNotAvailable):
+            pass
+
+
+def content_type(path):
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,7 +54,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestLogMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -86,7 +90,7 @@ WSGI_APPLICATION = "foodgram_backend.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
         "NAME": os.getenv("POSTGRES_DB", "foodgram_db"),
         "USER": os.getenv("DATABASE_USER", "foodgram_user"),
         "PASSWORD": os.getenv("DATABASE_PASSWORD", "foodgram_password"),
@@ -95,6 +99,57 @@ DATABASES = {
     }
 }
 
+# Кеши. Общий бэкенд: file - каталог на диске (один контейнер), db -
+# таблица в БД (нужен manage.py createcachetable), redis - в продакшене.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+CACHE_BACKENDS = {
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION",
+            os.path.join(tempfile.gettempdir(), "foodgram-cache"),
+        ),
+    },
+    "db": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://redis:6379/0"),
+    },
+}
+# Именованные кеши foodgram_backend.cache.get_cache(name): LRU в памяти
+# процесса (LOCAL_SIZE записей, не дольше LOCAL_TIMEOUT секунд) перед
+# общим кешем.
+TIERED_CACHES = {
+    "ingredients": {"TIMEOUT": 3600, "LOCAL_SIZE": 512, "LOCAL_TIMEOUT": 60},
+    "recipes": {"TIMEOUT": 300, "LOCAL_SIZE": 1024, "LOCAL_TIMEOUT": 5},
+    "auth": {"TIMEOUT": 300, "LOCAL_SIZE": 1024, "LOCAL_TIMEOUT": 5},
+    "relations": {"TIMEOUT": 300, "LOCAL_SIZE": 2048, "LOCAL_TIMEOUT": 5},
+}
+# Блокировки корзин ограничения частоты требуют атомарного add() между
+# процессами, которого нет у файлового кеша: в этом случае корзины
+# хранятся в таблице БД (создается миграцией api.0003).
+THROTTLE_CACHE_BACKEND = os.getenv(
+    "THROTTLE_CACHE_BACKEND",
+    "db" if CACHE_BACKEND == "file" else CACHE_BACKEND,
+)
+CACHES = {
+    "default": {**CACHE_BACKENDS[CACHE_BACKEND], "KEY_PREFIX": "default"},
+    "throttling": {
+        **CACHE_BACKENDS[THROTTLE_CACHE_BACKEND],
+        "KEY_PREFIX": "throttling",
+    },
+}
+for alias in TIERED_CACHES:
+    # Срок жизни значений задается явно, счетчики статистики бессрочные.
+    CACHES[alias] = {
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        "KEY_PREFIX": alias,
+        "TIMEOUT": None,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -133,6 +188,111 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "static"
 
+# Загруженные изображения именуются по sha256 содержимого, поэтому
+# их можно кешировать навсегда.
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "filesystem")
+
+STORAGES = {
+    "default": {
+        "BACKEND": "api.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "api.storage.CompressedStaticFilesStorage",
+    },
+}
+if MEDIA_STORAGE == "s3":
+    STORAGES["default"] = {
+        "BACKEND": "api.storage_s3.ContentAddressedS3Storage",
+        "OPTIONS": {
+            "bucket_name": os.getenv("S3_BUCKET_NAME", "foodgram-media"),
+            "endpoint_url": os.getenv("S3_ENDPOINT_URL"),
+            "access_key": os.getenv("S3_ACCESS_KEY"),
+            "secret_key": os.getenv("S3_SECRET_KEY"),
+            "region_name": os.getenv("S3_REGION_NAME"),
+            "custom_domain": os.getenv("S3_CUSTOM_DOMAIN"),
+            "querystring_auth": False,
+            "file_overwrite": True,
+            "object_parameters": {"CacheControl": MEDIA_CACHE_CONTROL},
+        },
+    }
+
+# Уменьшенные копии изображений: /media/r/<ширина>x<высота>/<путь>.
+# 80x80 - карточки подписок, 400x300 - список рецептов,
+# 800x600 - страница рецепта.
+IMAGE_RESIZE_SIZES = {
+    (80, 80),
+    (400, 300),
+    (800, 600),
+}
+IMAGE_CACHE_ROOT = os.getenv(
+    "IMAGE_CACHE_ROOT", os.path.join(BASE_DIR, "resized")
+)
+# Размер кеша проверяет команда evict_image_cache, а не запросы.
+IMAGE_CACHE_MAX_BYTES = int(
+    os.getenv("IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+IMAGE_CACHE_TOUCH_INTERVAL = 3600
+# Пустое значение отключает X-Accel-Redirect (например, без nginx).
+IMAGE_ACCEL_REDIRECT_PREFIX = os.getenv(
+    "IMAGE_ACCEL_REDIRECT_PREFIX", "/_resized/"
+)
+
+# Каталог, в котором сохраняются сжатые снимки каталога ингредиентов,
+# чтобы их не пересобирал каждый воркер. Без него снимки только в памяти.
+INGREDIENT_SNAPSHOT_ROOT = os.getenv("INGREDIENT_SNAPSHOT_ROOT")
+
+# Сжатие ответов. text/html не сжимается: в страницах админки есть
+# CSRF-токен, а сжатие таких ответов открывает атаку BREACH.
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_TYPES = {
+    "application/json",
+    "application/x-msgpack",
+    "text/plain",
+    "text/csv",
+}
+COMPRESSION_LEVELS = {"gzip": 6, "br": 4}
+
+# Журнал запросов: по строке JSON на запрос (api.middleware.
+# RequestLogMiddleware). Запись в stdout идет из фонового потока.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "api.logs.JSONFormatter"},
+    },
+    "handlers": {
+        "background": {
+            "()": "api.logs.BackgroundHandler",
+            "formatter": "json",
+        },
+    },
+    "root": {
+        "handlers": ["background"],
+        "level": os.getenv("LOG_LEVEL", "WARNING"),
+    },
+    "loggers": {
+        "api.access": {
+            "handlers": ["background"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+# manage.py test: журнал запросов и ошибки 500 из сценариев со сбоями не
+# засоряют вывод, assertLogs перехватывает записи своим обработчиком.
+if sys.argv[1:2] == ["test"]:
+    LOGGING["handlers"]["background"] = {"class": "logging.NullHandler"}
+
+# Поиск N+1 и медленных запросов (api.queries) для разработки и
+# стенда: QUERY_INSPECTOR=warn пишет предупреждение в лог, raise -
+# бросает NPlusOneError, когда один запрос повторился больше
+# QUERY_REPEAT_LIMIT раз за запрос к API. SLOW_QUERY_MS=0 отключает
+# журнал медленных запросов.
+QUERY_INSPECTOR = os.getenv("QUERY_INSPECTOR", "")
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", 5))
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 0))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -151,9 +311,35 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "api.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "api.pagination.CustomUserPagination",
     "PAGE_SIZE": 6,
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.ActionTokenBucketThrottle",
+    ],
+    # Один прокси - nginx из infra/, порт backend наружу не публикуется.
+    # Без nginx перед приложением нужен NUM_PROXIES=0.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 1)),
+}
+
+# Ограничения частоты запросов по действиям вьюсетов: "<basename>.<action>".
+# Значение - строка "число/период" или словарь с "rate" и "burst".
+THROTTLE_CACHE_ALIAS = "throttling"
+THROTTLE_ACTION_RATES = {
+    "user.create": {"rate": "10/hour", "burst": 3},
+    "user.subscribe": "60/min",
+    "recipe.favorite": "60/min",
+    "recipe.shopping_cart": "60/min",
+    "recipe.favorite_bulk": "20/min",
+    "recipe.shopping_cart_bulk": "20/min",
+    "recipe.download_shopping_cart": {"rate": "10/min", "burst": 3},
 }
+if os.getenv("THROTTLING_DISABLED") == "1":
+    THROTTLE_ACTION_RATES = {}
 
 DJOSER = {
     "SERIALIZERS": {
@@ -171,3 +357,41 @@ MIN_AMOUNT_VALUE = 1
 MAX_AMOUNT_VALUE = 32_000
 MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 32_000
+
+# Таблица единиц и плотностей для списка покупок. В контейнере каталог
+# data смонтирован рядом с manage.py (/app/data).
+UNITS_DATA_PATH = os.getenv(
+    "UNITS_DATA_PATH", str(BASE_DIR / "data" / "units.json")
+)
+
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_WINDOW_DAYS = 14
+TRENDING_WEIGHTS = {
+    "favorite": 1.0,
+    "shopping_cart": 0.5,
+}
+
+SIMILAR_RECIPES_COUNT = 10
+
+BULK_RELATIONS_MAX_SIZE = 100
+
+# Граф подписок (recipes.graph). Если включен кеш, взаимные подписки и
+# рекомендации считаются в памяти по спискам смежности из кеша
+# "relations"; списки длиннее SOCIAL_GRAPH_CACHE_MAX_DEGREE не кешируются.
+SOCIAL_GRAPH_CACHE = os.getenv("SOCIAL_GRAPH_CACHE") == "1"
+SOCIAL_GRAPH_CACHE_MAX_DEGREE = 100_000
+SOCIAL_GRAPH_FANOUT = 200
+SOCIAL_GRAPH_SUGGESTIONS = 20
+
+# gc_media не трогает файлы моложе этого срока: их загрузка может быть
+# еще не закоммичена.
+MEDIA_GC_GRACE_HOURS = 24
+
+# Задачи удаления пользователей выполняет команда process_deletion_jobs
+# (сервис deletion-worker в docker-compose). Поток в воркере gunicorn
+# погибает при его перезапуске по max_requests, поэтому включается только
+# явно: USER_DELETION_IN_THREAD=1.
+USER_DELETION_IN_THREAD = os.getenv("USER_DELETION_IN_THREAD") == "1"
+# Задача в статусе RUNNING без отметки о прогрессе дольше этого срока
+# считается прерванной и снова берется process_deletion_jobs.
+USER_DELETION_STALE_SECONDS = 900
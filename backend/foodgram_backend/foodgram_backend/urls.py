@@ -17,7 +17,7 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from api.views import RedirectFromShortView
+from api.views import HealthView, RedirectFromShortView, ResizedImageView
 
 urlpatterns = [
     path(
@@ -25,6 +25,12 @@ urlpatterns = [
         RedirectFromShortView.as_view(),
         name="short-link",
     ),
+    path(
+        "media/r/<int:width>x<int:height>/<path:path>",
+        ResizedImageView.as_view(),
+        name="resized-image",
+    ),
+    path("healthz", HealthView.as_view(), name="healthz"),
     path("api/", include("api.urls")),
     path("admin/", admin.site.urls),
 ]
@@ -8,9 +8,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
 import os
+from importlib import import_module
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram_backend.settings")
 
 application = get_wsgi_application()
+
+# Django импортирует URLconf, а вместе с ним views и сериализаторы, только
+# на первом запросе. Загружаем их сразу: с gunicorn --preload это
+# происходит один раз в мастер-процессе до запуска воркеров.
+import_module(settings.ROOT_URLCONF)
@@ -0,0 +1,99 @@
+import math
+import os
+
+# Профиль воркеров: sync - по процессу на запрос, gthread - потоки внутри
+# процесса, gevent - greenlet'ы для медленных клиентов и долгих запросов.
+PROFILES = ("sync", "gthread", "gevent")
+# Ориентировочный объем памяти одного воркера после прогрева, МБ.
+WORKER_MEMORY_MB = int(os.getenv("GUNICORN_WORKER_MEMORY_MB", 160))
+# Часть памяти контейнера, которую могут занять воркеры.
+MEMORY_SHARE = 0.75
+
+
+def cpu_limit():
+    # Квота CPU контейнера (cgroup v2), иначе доступные процессу ядра.
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+
+def memory_limit_mb():
+    for path in (
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ):
+        try:
+            with open(path) as file:
+                value = file.read().strip()
+        except OSError:
+            continue
+        # Очень большое значение в cgroup v1 означает отсутствие лимита.
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) // 2**20
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+
+
+profile = os.getenv("GUNICORN_PROFILE", "gthread")
+if profile not in PROFILES:
+    raise RuntimeError(
+        f"GUNICORN_PROFILE должен быть одним из {', '.join(PROFILES)}"
+    )
+
+cpus = cpu_limit()
+max_workers = max(1, int(memory_limit_mb() * MEMORY_SHARE / WORKER_MEMORY_MB))
+
+if profile == "sync":
+    workers = 2 * cpus + 1
+    threads = 1
+elif profile == "gthread":
+    workers = cpus + 1
+    threads = int(os.getenv("GUNICORN_THREADS", 4))
+else:
+    workers = cpus
+    threads = 1
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 200))
+
+workers = int(os.getenv("GUNICORN_WORKERS", min(workers, max_workers)))
+worker_class = profile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+# Перезапуск воркера после N запросов ограничивает утечки памяти,
+# jitter не дает всем воркерам перезапуститься одновременно.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+# Приложение загружается в мастере до форка воркеров.
+preload_app = True
+# Heartbeat-файлы воркеров в памяти, а не на overlay-диске контейнера.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")
+errorlog = "-"
+
+if profile == "gevent":
+    # Патчить нужно до импорта приложения в мастере, иначе сокеты и
+    # psycopg2 останутся блокирующими.
+    from gevent import monkey
+    from psycogreen.gevent import patch_psycopg
+
+    monkey.patch_all()
+    patch_psycopg()
+
+
+def on_starting(server):
+    server.log.info(
+        "Профиль %s: %s воркеров, %s потоков, CPU %s, лимит воркеров "
+        "по памяти %s",
+        profile,
+        workers,
+        threads,
+        cpus,
+        max_workers,
+    )
@@ -7,6 +7,9 @@ from .models import (
     WishList,
     Follow,
     AmountIngredientInRecipe,
+    RecipeDocument,
+    RecipeScore,
+    UserDeletionJob,
 )
 
 
@@ -30,3 +33,29 @@ admin.site.register(UserFavorite)
 admin.site.register(WishList)
 admin.site.register(Follow)
 admin.site.register(AmountIngredientInRecipe)
+
+
+@admin.register(RecipeScore)
+class RecipeScoreRegister(admin.ModelAdmin):
+    list_display = ("recipe", "popularity", "trending", "updated_at")
+    readonly_fields = ("recipe", "popularity", "trending", "updated_at")
+
+
+@admin.register(RecipeDocument)
+class RecipeDocumentRegister(admin.ModelAdmin):
+    list_display = (
+        "recipe", "format", "recipe_version", "author_version", "built_at"
+    )
+    readonly_fields = (
+        "recipe", "data", "format", "recipe_version", "author_version",
+        "built_at",
+    )
+
+
+@admin.register(UserDeletionJob)
+class UserDeletionJobRegister(admin.ModelAdmin):
+    list_display = ("user_id", "status", "progress", "created", "finished")
+    list_filter = ("status",)
+    readonly_fields = (
+        "user_id", "status", "progress", "error", "created", "finished"
+    )
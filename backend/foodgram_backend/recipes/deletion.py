@@ -0,0 +1,222 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram_backend.images import delete_variants
+
+from .media import still_referenced, storage_lock
+from .models import (
+    AmountIngredientInRecipe,
+    Follow,
+    Recipe,
+    RecipeDocument,
+    RecipeScore,
+    RecipeSimilarity,
+    UserDeletionJob,
+    UserFavorite,
+    WishList,
+)
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+FILE_WORKERS = 4
+
+# Зависимые от рецепта таблицы в порядке удаления.
+RECIPE_DEPENDENTS = (
+    ("ingredients", AmountIngredientInRecipe, "recipe__in"),
+    ("favorites", UserFavorite, "recipe__in"),
+    ("shopping_carts", WishList, "recipe__in"),
+    ("scores", RecipeScore, "recipe__in"),
+    ("documents", RecipeDocument, "recipe__in"),
+    ("similar", RecipeSimilarity, "recipe__in"),
+    ("similar", RecipeSimilarity, "similar__in"),
+)
+
+
+def delete_in_batches(queryset, batch_size=BATCH_SIZE):
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        count, _ = model.objects.filter(pk__in=pks).delete()
+        deleted += count
+
+
+class DeletionProgress:
+    def __init__(self, job=None):
+        self.job = job
+        self.counts = dict(job.progress) if job else {}
+
+    def add(self, name, count):
+        self.counts[name] = self.counts.get(name, 0) + count
+        if self.job:
+            self.job.progress = self.counts
+            self.job.heartbeat = timezone.now()
+            self.job.save(update_fields=["progress", "heartbeat"])
+
+
+def delete_recipes(recipe_ids, progress=None, files=None):
+    progress = progress or DeletionProgress()
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        images = list(
+            Recipe.objects.filter(pk__in=batch).values_list("image", flat=True)
+        )
+        for name, model, lookup in RECIPE_DEPENDENTS:
+            progress.add(
+                name, delete_in_batches(model.objects.filter(**{lookup: batch}))
+            )
+        count, _ = Recipe.objects.filter(pk__in=batch).delete()
+        progress.add("recipes", count)
+        delete_files(images, files)
+    return progress.counts
+
+
+def delete_files(names, executor=None):
+    # Одинаковые изображения хранятся в одном файле, поэтому удаляем
+    # только те, на которые больше никто не ссылается.
+    names = {name for name in names if name}
+    if not names:
+        return
+    names -= still_referenced(names)
+    if executor is None:
+        for name in names:
+            _delete_file(name)
+        return
+    # Повторная проверка ссылок идет из потока пула под блокировкой файла.
+    # Имена делятся на FILE_WORKERS частей, и каждая задача закрывает свое
+    # соединение с базой.
+    names = sorted(names)
+    for start in range(min(FILE_WORKERS, len(names))):
+        executor.submit(_delete_files_in_thread, names[start::FILE_WORKERS])
+
+
+def _delete_files_in_thread(names):
+    try:
+        for name in names:
+            _delete_file(name)
+    finally:
+        connection.close()
+
+
+def _delete_file(name):
+    # Проверка и удаление - под блокировкой ContentAddressedStorage._save.
+    # Загрузка того же содержимого либо закончилась раньше и обновила
+    # mtime, либо начнется после удаления и запишет файл заново. Строка
+    # со ссылкой на файл появляется только после коммита загрузки, поэтому
+    # недавние файлы, как и в gc_media, не трогаем.
+    with storage_lock(name):
+        if still_referenced([name]) or recently_saved(name):
+            return
+        default_storage.delete(name)
+    delete_variants(name)
+
+
+def recently_saved(name):
+    try:
+        modified = default_storage.get_modified_time(name)
+    except (FileNotFoundError, NotImplementedError):
+        return False
+    grace = timedelta(hours=settings.MEDIA_GC_GRACE_HOURS)
+    return modified > timezone.now() - grace
+
+
+def delete_user(user_id, progress=None):
+    progress = progress or DeletionProgress()
+    with ThreadPoolExecutor(max_workers=FILE_WORKERS) as files:
+        recipes = Recipe.objects.filter(author_id=user_id).order_by("pk")
+        while True:
+            batch = list(recipes.values_list("pk", flat=True)[:BATCH_SIZE])
+            if not batch:
+                break
+            delete_recipes(batch, progress, files)
+
+        for name, queryset in (
+            ("favorites", UserFavorite.objects.filter(user_id=user_id)),
+            ("shopping_carts", WishList.objects.filter(user_id=user_id)),
+            (
+                "follows",
+                Follow.objects.filter(
+                    Q(user_id=user_id) | Q(following_id=user_id)
+                ),
+            ),
+        ):
+            progress.add(name, delete_in_batches(queryset))
+
+        avatar = User.objects.filter(pk=user_id).values_list(
+            "image", flat=True
+        ).first()
+        count, _ = User.objects.filter(pk=user_id).delete()
+        progress.add("users", count)
+        delete_files([avatar], files)
+    return progress.counts
+
+
+def claimable_jobs(resume=False):
+    # RUNNING без свежей отметки - задача, чей обработчик погиб.
+    Status = UserDeletionJob.Status
+    stale = timezone.now() - timedelta(
+        seconds=settings.USER_DELETION_STALE_SECONDS
+    )
+    condition = Q(status=Status.PENDING) | Q(
+        Q(heartbeat__isnull=True) | Q(heartbeat__lt=stale),
+        status=Status.RUNNING,
+    )
+    if resume:
+        condition |= Q(status=Status.FAILED)
+    return UserDeletionJob.objects.filter(condition)
+
+
+def run_deletion_job(job_id, resume=False):
+    # Задачу выполняет тот, чей UPDATE перевел ее в RUNNING: два
+    # обработчика не возьмут одну задачу одновременно.
+    claimed = claimable_jobs(resume).filter(pk=job_id).update(
+        status=UserDeletionJob.Status.RUNNING, heartbeat=timezone.now()
+    )
+    job = UserDeletionJob.objects.get(pk=job_id)
+    if not claimed:
+        return job
+    try:
+        delete_user(job.user_id, DeletionProgress(job))
+    except Exception as error:
+        job.status = UserDeletionJob.Status.FAILED
+        job.error = str(error)
+    else:
+        job.status = UserDeletionJob.Status.DONE
+        job.error = ""
+    job.finished = timezone.now()
+    job.save(update_fields=["status", "error", "finished"])
+    return job
+
+
+def _run_in_thread(job_id):
+    try:
+        run_deletion_job(job_id)
+    finally:
+        connection.close()
+
+
+def schedule_user_deletion(user):
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        job = UserDeletionJob.objects.create(user_id=user.pk)
+
+    def start():
+        threading.Thread(
+            target=_run_in_thread, args=(job.pk,), daemon=True
+        ).start()
+
+    if settings.USER_DELETION_IN_THREAD:
+        transaction.on_commit(start)
+    return job
@@ -0,0 +1,192 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Count, Exists, OuterRef, Value, When
+
+from foodgram_backend.cache import get_cache
+
+from .models import Follow
+
+User = get_user_model()
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+ADJACENCY_KEY = "graph:{direction}:{user_id}"
+# Слишком большие списки смежности (подписчики популярных авторов)
+# не кешируются: массив занимает 8 байт на связь.
+TOO_LARGE = None
+
+
+def follows(user_id, following):
+    return Follow.objects.filter(user_id=user_id, following=following)
+
+
+def followers(user_id):
+    # Подписчики автора: полуобъединение через IN, которое база начинает
+    # с индекса Follow(following, user), а не с перебора пользователей.
+    return User.objects.filter(
+        pk__in=Follow.objects.filter(following_id=user_id).values("user_id")
+    )
+
+
+def mutual(user_id):
+    # Перебираются только мои подписки, и для каждой одна проверка
+    # обратной связи по уникальному индексу (user, following).
+    return User.objects.filter(
+        Exists(follows(OuterRef("pk"), user_id)),
+        pk__in=Follow.objects.filter(user_id=user_id).values("following_id"),
+    )
+
+
+def suggestion_scores(user_id, limit):
+    # Авторы, на которых подписаны мои авторы, кроме уже моих и меня.
+    # Оценка - сколько моих авторов на них подписано. Обходятся подписки
+    # только SOCIAL_GRAPH_FANOUT авторов с наибольшими id, чтобы второй
+    # уровень не рос вместе с числом подписок.
+    seeds = (
+        Follow.objects.filter(user_id=user_id)
+        .order_by("-following_id")
+        .values("following_id")[:settings.SOCIAL_GRAPH_FANOUT]
+    )
+    return list(
+        Follow.objects.filter(user_id__in=seeds)
+        .exclude(following_id=user_id)
+        .exclude(Exists(follows(user_id, OuterRef("following_id"))))
+        .values("following_id")
+        .annotate(score=Count("user_id"))
+        .order_by("-score", "following_id")
+        .values_list("following_id", "score")[:limit]
+    )
+
+
+def load_adjacency(user_id, direction):
+    if direction == FOLLOWING:
+        ids = Follow.objects.filter(user_id=user_id).values_list(
+            "following_id", flat=True
+        ).order_by("following_id")
+    else:
+        ids = Follow.objects.filter(following_id=user_id).values_list(
+            "user_id", flat=True
+        ).order_by("user_id")
+    limit = settings.SOCIAL_GRAPH_CACHE_MAX_DEGREE
+    ids = list(ids[:limit + 1])
+    if len(ids) > limit:
+        return TOO_LARGE
+    return array("q", ids)
+
+
+def adjacency(user_id, direction):
+    # Отсортированный массив id соседей из кеша "relations".
+    return get_cache("relations").get_or_set(
+        ADJACENCY_KEY.format(direction=direction, user_id=user_id),
+        lambda: load_adjacency(user_id, direction),
+    )
+
+
+def forget_adjacency(user_id, following_id):
+    cache = get_cache("relations")
+    cache.delete(ADJACENCY_KEY.format(direction=FOLLOWING, user_id=user_id))
+    cache.delete(
+        ADJACENCY_KEY.format(direction=FOLLOWERS, user_id=following_id)
+    )
+
+
+def contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def cached_mutual_ids(user_id):
+    following = adjacency(user_id, FOLLOWING)
+    followers_ids = adjacency(user_id, FOLLOWERS)
+    if following is TOO_LARGE or followers_ids is TOO_LARGE:
+        return None
+    if len(following) > len(followers_ids):
+        following, followers_ids = followers_ids, following
+    return [pk for pk in following if contains(followers_ids, pk)]
+
+
+def load_following(user_ids):
+    # Подписки сразу нескольких пользователей одним запросом.
+    limit = settings.SOCIAL_GRAPH_CACHE_MAX_DEGREE
+    lists = {user_id: array("q") for user_id in user_ids}
+    rows = (
+        Follow.objects.filter(user_id__in=user_ids)
+        .order_by("user_id", "following_id")
+        .values_list("user_id", "following_id")
+    )
+    for user_id, following_id in rows.iterator():
+        ids = lists[user_id]
+        if ids is TOO_LARGE:
+            continue
+        if len(ids) == limit:
+            lists[user_id] = TOO_LARGE
+        else:
+            ids.append(following_id)
+    return lists
+
+
+def following_adjacency(user_ids):
+    # Списки подписок из кеша "relations", недостающие - одним запросом.
+    cache = get_cache("relations")
+    keys = {
+        ADJACENCY_KEY.format(direction=FOLLOWING, user_id=user_id): user_id
+        for user_id in user_ids
+    }
+    lists = {keys[key]: ids for key, ids in cache.get_many(keys).items()}
+    missing = [user_id for user_id in user_ids if user_id not in lists]
+    if missing:
+        loaded = load_following(missing)
+        cache.set_many(
+            {
+                ADJACENCY_KEY.format(direction=FOLLOWING, user_id=user_id): ids
+                for user_id, ids in loaded.items()
+            }
+        )
+        lists.update(loaded)
+    return lists
+
+
+def cached_suggestion_scores(user_id, limit):
+    following = adjacency(user_id, FOLLOWING)
+    if following is TOO_LARGE:
+        return None
+    scores = Counter()
+    seeds = following_adjacency(following[-settings.SOCIAL_GRAPH_FANOUT:])
+    for seed_following in seeds.values():
+        if seed_following is TOO_LARGE:
+            return None
+        scores.update(seed_following)
+    scores.pop(user_id, None)
+    for pk in following:
+        scores.pop(pk, None)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[
+        :limit
+    ]
+
+
+def get_mutual(user_id):
+    if settings.SOCIAL_GRAPH_CACHE:
+        ids = cached_mutual_ids(user_id)
+        if ids is not None:
+            return User.objects.filter(pk__in=ids)
+    return mutual(user_id)
+
+
+def get_suggestions(user_id, limit):
+    scores = None
+    if settings.SOCIAL_GRAPH_CACHE:
+        scores = cached_suggestion_scores(user_id, limit)
+    if scores is None:
+        scores = suggestion_scores(user_id, limit)
+    ids = [pk for pk, _ in scores]
+    # Порядок оценок сохраняется в выдаче.
+    return User.objects.filter(pk__in=ids).order_by(
+        Case(
+            *(When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)),
+            default=Value(len(ids)),
+        )
+    )
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import refresh_similarity
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает таблицу похожих рецептов. По умолчанию обрабатывает "
+        "только новые и измененные рецепты."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересчитать соседей для всех рецептов.",
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_similarity(
+            settings.SIMILAR_RECIPES_COUNT, full=options["full"]
+        )
+        self.stdout.write(f"Обновлено рецептов: {updated}")
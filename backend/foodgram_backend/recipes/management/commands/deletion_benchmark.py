@@ -0,0 +1,140 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.deletion import run_deletion_job
+from recipes.models import (
+    AmountIngredientInRecipe,
+    Follow,
+    Ingredient,
+    Recipe,
+    UserDeletionJob,
+    UserFavorite,
+    WishList,
+)
+
+User = get_user_model()
+
+PREFIX = "deletionbench"
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает пользователя с синтетическими рецептами и связями и "
+        "замеряет его удаление через задачу UserDeletionJob"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=2000)
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, default=8
+        )
+        parser.add_argument(
+            "--readers",
+            type=int,
+            default=200,
+            help="Пользователи, которые подписаны на автора и добавили "
+            "его рецепты в избранное и список покупок.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        ingredient_ids = list(Ingredient.objects.values_list("pk", flat=True))
+        if len(ingredient_ids) < options["ingredients_per_recipe"]:
+            raise CommandError("В базе недостаточно ингредиентов.")
+
+        author, readers = self.create_users(options["readers"])
+        rows = self.create_recipes(
+            author,
+            readers,
+            options["recipes"],
+            options["ingredients_per_recipe"],
+            ingredient_ids,
+            rng,
+        )
+        job = UserDeletionJob.objects.create(user_id=author.pk)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            job = run_deletion_job(job.pk)
+            elapsed = time.perf_counter() - start
+        User.objects.filter(username__startswith=PREFIX).delete()
+
+        if job.status != UserDeletionJob.Status.DONE:
+            raise CommandError(f"Задача завершилась ошибкой: {job.error}")
+        deleted = sum(job.progress.values())
+        self.stdout.write(f"Создано строк: {rows}, удалено: {deleted}")
+        self.stdout.write(f"Прогресс: {job.progress}")
+        self.stdout.write(
+            f"Время: {elapsed * 1000:.0f} мс, "
+            f"{deleted / elapsed:.0f} строк/с, запросов: {len(context)}"
+        )
+
+    def create_users(self, readers):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        User.objects.bulk_create(
+            User(
+                username=f"{PREFIX}{index}",
+                email=f"{PREFIX}{index}@example.com",
+                first_name="Удаление",
+                last_name=f"{index:05d}",
+                password="!",
+            )
+            for index in range(readers + 1)
+        )
+        users = list(
+            User.objects.filter(username__startswith=PREFIX).order_by("pk")
+        )
+        return users[0], users[1:]
+
+    def create_recipes(
+        self, author, readers, count, per_recipe, ingredient_ids, rng
+    ):
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author=author,
+                    name=f"{PREFIX} {index}",
+                    image=f"recipes/images/{PREFIX}.png",
+                    description="Синтетический рецепт.",
+                    cookingTime=10,
+                )
+                for index in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(author=author).values_list("pk", flat=True)
+        )
+        amounts = [
+            AmountIngredientInRecipe(
+                recipe_id=recipe_id, ingredient_id=ingredient_id, amount=1
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(ingredient_ids, per_recipe)
+        ]
+        AmountIngredientInRecipe.objects.bulk_create(
+            amounts, batch_size=BATCH_SIZE
+        )
+        relations = []
+        for model in (UserFavorite, WishList):
+            objs = [
+                model(user=reader, recipe_id=recipe_id)
+                for reader in readers
+                for recipe_id in rng.sample(
+                    recipe_ids, min(10, len(recipe_ids))
+                )
+            ]
+            model.objects.bulk_create(
+                objs, batch_size=BATCH_SIZE, ignore_conflicts=True
+            )
+            relations += objs
+        follows = Follow.objects.bulk_create(
+            Follow(user=reader, following=author) for reader in readers
+        )
+        return len(recipe_ids) + len(amounts) + len(relations) + len(follows)
@@ -0,0 +1,72 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.media import Collector, load_references
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет файлы в MEDIA_ROOT, на которые не ссылается ни один "
+        "рецепт или пользователь"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, сколько места освободится.",
+        )
+        parser.add_argument(
+            "--quarantine",
+            help="Переносить файлы в этот каталог вместо удаления.",
+        )
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=settings.MEDIA_GC_GRACE_HOURS,
+            help="Не трогать файлы моложе этого срока.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Сколько каталогов обходить параллельно.",
+        )
+
+    def handle(self, *args, **options):
+        if settings.MEDIA_STORAGE != "filesystem":
+            raise CommandError(
+                "gc_media работает только с файловым хранилищем."
+            )
+        quarantine = options["quarantine"]
+        if quarantine:
+            quarantine = os.path.abspath(quarantine)
+        collector = Collector(
+            load_references(),
+            grace=options["grace_hours"] * 3600,
+            dry_run=options["dry_run"],
+            quarantine=quarantine,
+        )
+        stats = collector.run(max(options["workers"], 1))
+        if options["dry_run"]:
+            action = "Будет освобождено"
+        elif quarantine:
+            action = "Перенесено в карантин"
+        else:
+            action = "Освобождено"
+        self.stdout.write(
+            f"Просмотрено файлов: {stats['files']}, "
+            f"пропущено недавних: {stats['recent']}, "
+            f"сирот: {stats['orphans']}. "
+            f"{action}: {format_size(stats['bytes'])}"
+        )
+
+
+def format_size(size):
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.deletion import claimable_jobs, run_deletion_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет задачи фонового удаления пользователей, в том числе "
+        "прерванные: RUNNING без свежей отметки о прогрессе"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Повторить задачи, завершившиеся ошибкой.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            help="Не завершаться, а проверять очередь раз в столько "
+            "секунд.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.process(options["resume"])
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def process(self, resume):
+        job_ids = claimable_jobs(resume).order_by("pk").values_list(
+            "pk", flat=True
+        )
+        for job_id in list(job_ids):
+            job = run_deletion_job(job_id, resume)
+            self.stdout.write(
+                f"Пользователь {job.user_id}: {job.get_status_display()} "
+                f"{job.progress} {job.error}".rstrip()
+            )
@@ -0,0 +1,75 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeScore, UserFavorite, WishList
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает популярность и рейтинг трендов рецептов"
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        weights = settings.TRENDING_WEIGHTS
+        sources = (
+            (UserFavorite, weights["favorite"]),
+            (WishList, weights["shopping_cart"]),
+        )
+
+        popularity = defaultdict(int)
+        for model, _ in sources:
+            counts = model.objects.values_list("recipe").annotate(
+                count=Count("id")
+            )
+            for recipe_id, count in counts.order_by():
+                popularity[recipe_id] += count
+
+        since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+        decay = math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+        trending = defaultdict(float)
+        for model, weight in sources:
+            events = (
+                model.objects.filter(created__gte=since)
+                .values_list("recipe_id", "created")
+                .order_by()
+                .iterator(chunk_size=BATCH_SIZE)
+            )
+            for recipe_id, created in events:
+                age = (now - created).total_seconds()
+                trending[recipe_id] += weight * math.exp(-decay * age)
+
+        recipe_ids = Recipe.objects.order_by("pk").values_list(
+            "pk", flat=True
+        )
+        batch = []
+        updated = 0
+        for recipe_id in recipe_ids.iterator(chunk_size=BATCH_SIZE):
+            batch.append(
+                RecipeScore(
+                    recipe_id=recipe_id,
+                    popularity=popularity.get(recipe_id, 0),
+                    trending=trending.get(recipe_id, 0),
+                )
+            )
+            if len(batch) >= BATCH_SIZE:
+                updated += self.save_scores(batch)
+                batch = []
+        updated += self.save_scores(batch)
+
+        self.stdout.write(f"Обновлено рейтингов: {updated}")
+
+    def save_scores(self, scores):
+        RecipeScore.objects.bulk_create(
+            scores,
+            update_conflicts=True,
+            unique_fields=["recipe"],
+            update_fields=["popularity", "trending", "updated_at"],
+        )
+        return len(scores)
@@ -0,0 +1,179 @@
+import os
+import posixpath
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db.models import FileField
+
+from foodgram_backend.images import delete_variants
+
+from .models import Recipe
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+
+def file_fields():
+    # Все файловые поля моделей с файлами пользователей.
+    return [
+        (model, field.name, field.upload_to)
+        for model in (Recipe, User)
+        for field in model._meta.get_fields()
+        if isinstance(field, FileField)
+    ]
+
+
+def load_references():
+    referenced = set()
+    for model, field_name, _ in file_fields():
+        names = (
+            model.objects.exclude(**{field_name: ""})
+            .exclude(**{f"{field_name}__isnull": True})
+            .values_list(field_name, flat=True)
+            .order_by()
+            .iterator(chunk_size=BATCH_SIZE)
+        )
+        referenced.update(names)
+    return referenced
+
+
+def still_referenced(names):
+    # Повторная проверка перед удалением: за время обхода файл мог снова
+    # понадобиться новому рецепту с тем же содержимым.
+    found = set()
+    for model, field_name, _ in file_fields():
+        found.update(
+            model.objects.filter(**{f"{field_name}__in": names}).values_list(
+                field_name, flat=True
+            )
+        )
+    return found
+
+
+def storage_lock(name):
+    # Блокировка ContentAddressedStorage._save: повторная загрузка того же
+    # содержимого не пересекается с удалением файла.
+    lock = getattr(default_storage, "lock", None)
+    return lock(name) if lock else nullcontext()
+
+
+def excluded_roots(*extra):
+    # Кеш уменьшенных копий и снимки каталога могут лежать внутри
+    # MEDIA_ROOT, но ссылок из базы на них нет.
+    roots = [
+        settings.IMAGE_CACHE_ROOT,
+        settings.INGREDIENT_SNAPSHOT_ROOT,
+        *extra,
+    ]
+    return {os.path.realpath(root) for root in roots if root}
+
+
+def shards(excluded):
+    # Каталоги загрузок, а внутри них - подкаталоги первого уровня
+    # (ab/ в адресации по содержимому). Файлы вне каталогов загрузок
+    # не трогаем.
+    for upload_to in sorted({upload_to for *_, upload_to in file_fields()}):
+        root = os.path.join(settings.MEDIA_ROOT, upload_to)
+        if not os.path.isdir(root):
+            continue
+        # Файлы прямо в каталоге загрузок - старые имена до адресации
+        # по содержимому.
+        yield root, False
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and (
+                    os.path.realpath(entry.path) not in excluded
+                ):
+                    yield entry.path, True
+
+
+def scan(path, recursive, excluded):
+    # Потоковый обход: в памяти только стек каталогов.
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and (
+                        os.path.realpath(entry.path) not in excluded
+                    ):
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+class Collector:
+    def __init__(self, referenced, grace, dry_run=False, quarantine=None):
+        self.referenced = referenced
+        self.cutoff = time.time() - grace
+        self.dry_run = dry_run
+        self.quarantine = quarantine
+        self.excluded = excluded_roots(quarantine)
+
+    def collect(self, shard):
+        # Выполняется в потоке: только обход диска, без запросов к базе.
+        path, recursive = shard
+        files = recent = 0
+        candidates = []
+        for entry in scan(path, recursive, self.excluded):
+            files += 1
+            name = posixpath.join(
+                *os.path.relpath(entry.path, settings.MEDIA_ROOT).split(os.sep)
+            )
+            if name in self.referenced:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            # Недавние файлы могут принадлежать незавершенной загрузке.
+            if stat.st_mtime > self.cutoff:
+                recent += 1
+                continue
+            candidates.append((name, entry.path, stat.st_size))
+        return files, recent, candidates
+
+    def remove(self, candidates, stats):
+        referenced = still_referenced([name for name, *_ in candidates])
+        for name, path, size in candidates:
+            if name in referenced:
+                continue
+            if self.dry_run:
+                stats["orphans"] += 1
+                stats["bytes"] += size
+                continue
+            with storage_lock(name):
+                # mtime из обхода мог устареть: загрузка того же содержимого
+                # обновляет его, а строка со ссылкой появится после коммита.
+                try:
+                    modified = os.stat(path).st_mtime
+                except FileNotFoundError:
+                    continue
+                if modified > self.cutoff:
+                    stats["recent"] += 1
+                    continue
+                if still_referenced([name]):
+                    continue
+                if self.quarantine:
+                    target = os.path.join(self.quarantine, name)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(path, target)
+                else:
+                    os.remove(path)
+            stats["orphans"] += 1
+            stats["bytes"] += size
+            delete_variants(name)
+
+    def run(self, workers):
+        stats = {"files": 0, "recent": 0, "orphans": 0, "bytes": 0}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(self.collect, shards(self.excluded))
+            for files, recent, candidates in results:
+                stats["files"] += files
+                stats["recent"] += recent
+                for start in range(0, len(candidates), BATCH_SIZE):
+                    self.remove(candidates[start:start + BATCH_SIZE], stats)
+        return stats
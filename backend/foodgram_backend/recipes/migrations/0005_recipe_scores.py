@@ -0,0 +1,98 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:15
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Когда добавлены уже существующие строки, неизвестно. Дата в прошлом,
+# а не время миграции, не дает им попасть в окно трендов
+# (TRENDING_WINDOW_DAYS), иначе первое время тренды совпадали бы с
+# популярностью за все время.
+UNKNOWN_CREATED = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_recipe_scores(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeScore = apps.get_model("recipes", "RecipeScore")
+    RecipeScore.objects.bulk_create(
+        (
+            RecipeScore(recipe_id=pk)
+            for pk in Recipe.objects.values_list("pk", flat=True)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_alter_amountingredientinrecipe_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userfavorite",
+            name="created",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                db_index=True,
+                default=UNKNOWN_CREATED,
+                verbose_name="Дата добавления",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="wishlist",
+            name="created",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                db_index=True,
+                default=UNKNOWN_CREATED,
+                verbose_name="Дата добавления",
+            ),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name="RecipeScore",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="score",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "popularity",
+                    models.PositiveIntegerField(default=0, verbose_name="Популярность"),
+                ),
+                (
+                    "trending",
+                    models.FloatField(default=0, verbose_name="Рейтинг трендов"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Дата пересчета"),
+                ),
+            ],
+            options={
+                "verbose_name": "Рейтинг рецепта",
+                "verbose_name_plural": "Рейтинги рецептов",
+                "indexes": [
+                    models.Index(
+                        fields=["-popularity", "-recipe"],
+                        name="recipescore_popularity_idx",
+                    ),
+                    models.Index(
+                        fields=["-trending", "-recipe"], name="recipescore_trending_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(create_recipe_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+def log_existing_ingredients(apps, schema_editor):
+    # Дельта от версии 0 должна содержать весь текущий каталог.
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    IngredientChange = apps.get_model("recipes", "IngredientChange")
+    IngredientChange.objects.bulk_create(
+        (
+            IngredientChange(ingredient_id=pk, operation="upsert")
+            for pk in Ingredient.objects.order_by("pk").values_list(
+                "pk", flat=True
+            )
+        ),
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_user_deletion_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngredientChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ingredient_id",
+                    models.BigIntegerField(verbose_name="ID ингредиента"),
+                ),
+                (
+                    "operation",
+                    models.CharField(
+                        choices=[
+                            ("upsert", "Добавлен или изменен"),
+                            ("delete", "Удален"),
+                        ],
+                        max_length=8,
+                        verbose_name="Операция",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата изменения"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Изменение каталога ингредиентов",
+                "verbose_name_plural": "Изменения каталога ингредиентов",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.RunPython(
+            log_existing_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_ingredient_changes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="version",
+            field=models.PositiveBigIntegerField(
+                default=1, editable=False, verbose_name="Версия"
+            ),
+        ),
+    ]
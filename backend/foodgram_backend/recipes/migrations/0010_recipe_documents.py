@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_recipe_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeDocument",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="document",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                ("data", models.JSONField(verbose_name="Документ")),
+                ("format", models.PositiveSmallIntegerField(verbose_name="Формат")),
+                (
+                    "recipe_version",
+                    models.PositiveBigIntegerField(verbose_name="Версия рецепта"),
+                ),
+                (
+                    "author_version",
+                    models.PositiveBigIntegerField(verbose_name="Версия автора"),
+                ),
+                (
+                    "built_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Дата сборки"),
+                ),
+            ],
+            options={
+                "verbose_name": "Документ рецепта",
+                "verbose_name_plural": "Документы рецептов",
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:15
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0011_follow_followers_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="amountingredientinrecipe",
+            name="amount",
+            field=models.PositiveSmallIntegerField(
+                validators=[
+                    django.core.validators.MinValueValidator(
+                        1, message="Время приготовления не может быть меньше 1 минуты"
+                    ),
+                    django.core.validators.MaxValueValidator(
+                        32000,
+                        message="Время приготовления не может быть больше 32000 минут",
+                    ),
+                ],
+                verbose_name="Количество ингредиента",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="cookingTime",
+            field=models.PositiveSmallIntegerField(
+                validators=[
+                    django.core.validators.MinValueValidator(
+                        1, message="Время приготовления не может быть меньше 1 минуты"
+                    ),
+                    django.core.validators.MaxValueValidator(
+                        32000,
+                        message="Время приготовления не может быть больше 32000 минут",
+                    ),
+                ],
+                verbose_name="Время приготовления (в минутах)",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:14
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def copy_computed_at(apps, schema_editor):
+    # Уже посчитанные рецепты не должны пересчитываться заново.
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeSimilarity = apps.get_model("recipes", "RecipeSimilarity")
+    Recipe.objects.update(
+        similarity_computed_at=Subquery(
+            RecipeSimilarity.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(computed_at=Max("computed_at"))
+            .values("computed_at")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0012_alter_amount_cooking_time_validators"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="similarity_computed_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Дата расчета похожих рецептов",
+            ),
+        ),
+        migrations.RunPython(copy_computed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0013_recipe_similarity_computed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdeletionjob",
+            name="heartbeat",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Последняя отметка"
+            ),
+        ),
+    ]
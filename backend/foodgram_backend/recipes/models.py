@@ -37,6 +37,13 @@ class Follow(models.Model):
                 name="check_self_follow",
             ),
         )
+        # Уникальное ограничение дает индекс (user, following) для
+        # подписок пользователя, этот - для списка подписчиков автора.
+        indexes = (
+            models.Index(
+                fields=("following", "user"), name="follow_followers_idx"
+            ),
+        )
 
     def __str__(self):
         return f"{self.user.username} подписался на {self.following.username}"
@@ -78,6 +85,29 @@ class Ingredient(models.Model):
         return f"{self.name} ({self.measurment})"
 
 
+class IngredientChange(models.Model):
+    # Журнал изменений каталога: id записи служит версией каталога.
+    class Operation(models.TextChoices):
+        UPSERT = "upsert", "Добавлен или изменен"
+        DELETE = "delete", "Удален"
+
+    ingredient_id = models.BigIntegerField(verbose_name="ID ингредиента")
+    operation = models.CharField(
+        max_length=8, choices=Operation.choices, verbose_name="Операция"
+    )
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата изменения"
+    )
+
+    class Meta:
+        verbose_name = "Изменение каталога ингредиентов"
+        verbose_name_plural = "Изменения каталога ингредиентов"
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.id}: {self.operation} {self.ingredient_id}"
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -116,6 +146,24 @@ class Recipe(models.Model):
         verbose_name="Время приготовления (в минутах)",
     )
 
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата изменения"
+    )
+
+    # Растет при каждом изменении рецепта, см. recipes.versions.
+    version = models.PositiveBigIntegerField(
+        default=1, editable=False, verbose_name="Версия"
+    )
+    # Время последнего расчета похожих рецептов, см. recipes.similarity.
+    # Ставится и тогда, когда соседей нет, иначе рецепт считался бы
+    # заново при каждом запуске.
+    similarity_computed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Дата расчета похожих рецептов",
+    )
+
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
@@ -124,6 +172,19 @@ class Recipe(models.Model):
     def __str__(self):
         return f"{self.name} Автор: {self.author.first_name} {self.author.last_name}"
 
+    def save(self, *args, **kwargs):
+        # Версию и дату расчета похожих рецептов меняют только запросы
+        # UPDATE. Полное сохранение ранее загруженного объекта не должно
+        # записать старые значения обратно.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ("version", "similarity_computed_at")
+            ]
+        super().save(*args, **kwargs)
+
 
 class AmountIngredientInRecipe(models.Model):
     recipe = models.ForeignKey(
@@ -185,6 +246,11 @@ class UserRecipeRelation(models.Model):
         related_name="%(class)s_set",
         verbose_name="Рецепт",
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name="Дата добавления",
+    )
 
     class Meta:
         abstract = True
@@ -227,3 +293,143 @@ class WishList(UserRecipeRelation):
             f"Рецепт {self.recipe.name} добавлен"
             f" в список покупок {self.user.username}"
         )
+
+
+class RecipeScore(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="score",
+        verbose_name="Рецепт",
+    )
+    popularity = models.PositiveIntegerField(
+        default=0, verbose_name="Популярность"
+    )
+    trending = models.FloatField(default=0, verbose_name="Рейтинг трендов")
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата пересчета"
+    )
+
+    class Meta:
+        verbose_name = "Рейтинг рецепта"
+        verbose_name_plural = "Рейтинги рецептов"
+        indexes = [
+            models.Index(
+                fields=["-popularity", "-recipe"],
+                name="recipescore_popularity_idx",
+            ),
+            models.Index(
+                fields=["-trending", "-recipe"],
+                name="recipescore_trending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe.name}: {self.popularity} / {self.trending:.2f}"
+
+
+class RecipeSimilarity(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_set",
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_to",
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField(verbose_name="Косинусная близость")
+    computed_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата расчета"
+    )
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "similar"], name="unique_recipe_similarity"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "-score"],
+                name="recipesimilarity_score_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe.name} ~ {self.similar.name}: {self.score:.3f}"
+
+
+class RecipeDocument(models.Model):
+    # Готовое представление рецепта без полей, зависящих от пользователя.
+    # Пересобирается при изменении рецепта, см. api.documents.
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="document",
+        verbose_name="Рецепт",
+    )
+    data = models.JSONField(verbose_name="Документ")
+    format = models.PositiveSmallIntegerField(verbose_name="Формат")
+    recipe_version = models.PositiveBigIntegerField(
+        verbose_name="Версия рецепта"
+    )
+    author_version = models.PositiveBigIntegerField(
+        verbose_name="Версия автора"
+    )
+    built_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата сборки"
+    )
+
+    class Meta:
+        verbose_name = "Документ рецепта"
+        verbose_name_plural = "Документы рецептов"
+
+    def __str__(self):
+        return f"{self.recipe_id}: v{self.recipe_version}"
+
+
+class UserDeletionJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Завершено"
+        FAILED = "failed", "Ошибка"
+
+    user_id = models.BigIntegerField(
+        db_index=True, verbose_name="ID удаляемого пользователя"
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+        verbose_name="Статус",
+    )
+    progress = models.JSONField(default=dict, verbose_name="Прогресс")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата создания"
+    )
+    finished = models.DateTimeField(
+        null=True, blank=True, verbose_name="Дата завершения"
+    )
+    # Обновляется вместе с прогрессом, см. recipes.deletion.
+    heartbeat = models.DateTimeField(
+        null=True, blank=True, verbose_name="Последняя отметка"
+    )
+
+    class Meta:
+        verbose_name = "Удаление пользователя"
+        verbose_name_plural = "Удаления пользователей"
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"Удаление пользователя {self.user_id}: {self.status}"
@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .models import Ingredient, IngredientChange, Recipe, RecipeScore
+from .versions import (
+    RECIPE,
+    USER,
+    USER_PUBLIC_FIELDS,
+    bump_versions,
+    forget_versions,
+    refresh_versions,
+)
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_score(sender, instance, created, **kwargs):
+    if created:
+        RecipeScore.objects.get_or_create(recipe=instance)
+
+
+# bulk_create/update/delete сигналов не отправляют, такие изменения
+# каталога нужно записывать в IngredientChange вручную.
+@receiver(post_save, sender=Ingredient)
+def log_ingredient_save(sender, instance, created, **kwargs):
+    IngredientChange.objects.create(
+        ingredient_id=instance.pk,
+        operation=IngredientChange.Operation.UPSERT,
+    )
+    if not created:
+        bump_recipes_with_ingredient(instance)
+
+
+@receiver(post_delete, sender=Ingredient)
+def log_ingredient_delete(sender, instance, **kwargs):
+    IngredientChange.objects.create(
+        ingredient_id=instance.pk,
+        operation=IngredientChange.Operation.DELETE,
+    )
+
+
+@receiver(pre_delete, sender=Ingredient)
+def bump_deleted_ingredient_recipes(sender, instance, **kwargs):
+    bump_recipes_with_ingredient(instance)
+
+
+def bump_recipes_with_ingredient(ingredient):
+    bump_versions(
+        RECIPE,
+        Recipe.objects.filter(ingredients=ingredient).values_list(
+            "pk", flat=True
+        ),
+    )
+
+
+# Версии рецептов и пользователей для проверки закешированных данных.
+# Строки AmountIngredientInRecipe пишутся через bulk_create и удаляются
+# запросом без сигналов. RecipeCreateSerializer.update заменяет их в той же
+# транзакции, что и сохранение рецепта, поэтому одного поднятия версии
+# здесь достаточно.
+@receiver(post_save, sender=Recipe)
+def bump_recipe_version(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        refresh_versions(RECIPE, [instance.pk])
+    else:
+        bump_versions(RECIPE, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_version(sender, instance, **kwargs):
+    forget_versions(RECIPE, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_recipe_ingredients_version(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if reverse and action == "pre_clear":
+        # Связи ингредиента еще не удалены, и по ним видны рецепты.
+        bump_recipes_with_ingredient(instance)
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            bump_versions(RECIPE, [instance.pk])
+        elif pk_set:
+            bump_versions(RECIPE, pk_set)
+
+
+@receiver(pre_save, sender=User)
+def detect_user_public_changes(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    if raw or instance._state.adding:
+        return
+    # User.save превращает полное сохранение в update_fields со всеми
+    # полями, поэтому изменения сверяются со строкой в базе. Устаревший
+    # объект, записывающий старые значения, тоже меняет публичные поля.
+    fields = USER_PUBLIC_FIELDS
+    if update_fields is not None:
+        fields = fields & set(update_fields)
+    if not fields:
+        instance._public_fields_changed = False
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._public_fields_changed = stored is None or any(
+        getattr(instance, field) != stored[field] for field in fields
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_user_version(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        refresh_versions(USER, [instance.pk])
+        return
+    # Вход пользователя, смена пароля и правки служебных полей в админке
+    # не меняют ответов API, версию не трогаем.
+    if not getattr(instance, "_public_fields_changed", True):
+        return
+    bump_versions(USER, [instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def forget_user_version(sender, instance, **kwargs):
+    forget_versions(USER, [instance.pk])
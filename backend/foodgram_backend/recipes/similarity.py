@@ -0,0 +1,121 @@
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import AmountIngredientInRecipe, Recipe, RecipeSimilarity
+
+BATCH_SIZE = 500
+
+
+def load_vectors():
+    ingredients = defaultdict(list)
+    rows = (
+        AmountIngredientInRecipe.objects.order_by()
+        .values_list("recipe_id", "ingredient_id")
+        .iterator(chunk_size=5000)
+    )
+    for recipe_id, ingredient_id in rows:
+        ingredients[recipe_id].append(ingredient_id)
+
+    document_frequency = defaultdict(int)
+    for items in ingredients.values():
+        for ingredient_id in items:
+            document_frequency[ingredient_id] += 1
+
+    total = len(ingredients)
+    idf = {
+        ingredient_id: math.log((1 + total) / (1 + count)) + 1
+        for ingredient_id, count in document_frequency.items()
+    }
+
+    vectors = {}
+    for recipe_id, items in ingredients.items():
+        norm = math.sqrt(sum(idf[item] ** 2 for item in items))
+        vectors[recipe_id] = {item: idf[item] / norm for item in items}
+    return vectors
+
+
+def build_inverted_index(vectors):
+    index = defaultdict(list)
+    for recipe_id, vector in vectors.items():
+        for ingredient_id, weight in vector.items():
+            index[ingredient_id].append((recipe_id, weight))
+    return index
+
+
+def top_similar(recipe_id, vectors, index, count):
+    scores = defaultdict(float)
+    for ingredient_id, weight in vectors.get(recipe_id, {}).items():
+        for other_id, other_weight in index[ingredient_id]:
+            if other_id != recipe_id:
+                scores[other_id] += weight * other_weight
+    return heapq.nlargest(
+        count, scores.items(), key=lambda item: (item[1], -item[0])
+    )
+
+
+def get_stale_recipe_ids():
+    return set(
+        Recipe.objects.filter(
+            Q(similarity_computed_at__isnull=True)
+            | Q(updated_at__gt=F("similarity_computed_at"))
+        ).values_list("pk", flat=True)
+    )
+
+
+def batches(recipe_ids):
+    recipe_ids = sorted(recipe_ids)
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        yield recipe_ids[start:start + BATCH_SIZE]
+
+
+def save_neighbors(batch, vectors, index, count, computed_at):
+    rows = []
+    for recipe_id in batch:
+        for similar_id, score in top_similar(recipe_id, vectors, index, count):
+            rows.append(
+                RecipeSimilarity(
+                    recipe_id=recipe_id, similar_id=similar_id, score=score
+                )
+            )
+    with transaction.atomic():
+        RecipeSimilarity.objects.filter(recipe_id__in=batch).delete()
+        RecipeSimilarity.objects.bulk_create(rows)
+        Recipe.objects.filter(pk__in=batch).update(
+            similarity_computed_at=computed_at
+        )
+    return rows
+
+
+def refresh_similarity(count, full=False):
+    # Отметка берется до чтения ингредиентов: рецепт, измененный во время
+    # расчета, останется устаревшим до следующего запуска.
+    computed_at = timezone.now()
+    vectors = load_vectors()
+    index = build_inverted_index(vectors)
+
+    if full:
+        targets = set(Recipe.objects.values_list("pk", flat=True))
+        for batch in batches(targets):
+            save_neighbors(batch, vectors, index, count, computed_at)
+        return len(targets)
+
+    # Измененные рецепты пересчитываются полностью, а их старые и новые
+    # соседи - один раз, чтобы обновить оценку близости к ним.
+    stale = get_stale_recipe_ids()
+    affected = set(
+        RecipeSimilarity.objects.filter(similar_id__in=stale)
+        .values_list("recipe_id", flat=True)
+        .distinct()
+    )
+    for batch in batches(stale):
+        rows = save_neighbors(batch, vectors, index, count, computed_at)
+        affected.update(row.similar_id for row in rows)
+    affected -= stale
+    for batch in batches(affected):
+        save_neighbors(batch, vectors, index, count, computed_at)
+    return len(stale) + len(affected)
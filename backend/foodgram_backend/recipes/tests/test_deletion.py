@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recipes.deletion import FILE_WORKERS, delete_files, delete_recipes
+from recipes.models import Recipe, UserDeletionJob
+
+User = get_user_model()
+
+
+class DeletionJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password-123",
+            first_name="Иван",
+            last_name="Иванов",
+        )
+        Recipe.objects.create(
+            author=self.user,
+            name="Суп",
+            image="",
+            description="Сварить.",
+            cookingTime=10,
+        )
+
+    def running_job(self, minutes_ago):
+        return UserDeletionJob.objects.create(
+            user_id=self.user.pk,
+            status=UserDeletionJob.Status.RUNNING,
+            heartbeat=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    def process(self):
+        call_command("process_deletion_jobs", stdout=StringIO())
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = self.running_job(minutes_ago=60)
+        self.process()
+        job.refresh_from_db()
+        self.assertEqual(job.status, UserDeletionJob.Status.DONE)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_live_running_job_is_left_alone(self):
+        job = self.running_job(minutes_ago=1)
+        self.process()
+        job.refresh_from_db()
+        self.assertEqual(job.status, UserDeletionJob.Status.RUNNING)
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+
+class DeleteFilesTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        override = override_settings(
+            MEDIA_ROOT=media, IMAGE_CACHE_ROOT=os.path.join(media, "resized")
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password-123",
+            first_name="Иван",
+            last_name="Иванов",
+        )
+
+    def upload(self, age_hours):
+        name = default_storage.save(
+            "recipes/images/soup.png", ContentFile(b"soup")
+        )
+        past = time.time() - age_hours * 3600
+        os.utime(default_storage.path(name), (past, past))
+        return name
+
+    def create_recipe(self, image):
+        return Recipe.objects.create(
+            author=self.user,
+            name="Суп",
+            image=image,
+            description="Сварить.",
+            cookingTime=10,
+        )
+
+    @override_settings(MEDIA_GC_GRACE_HOURS=1)
+    def test_old_unreferenced_file_is_deleted(self):
+        name = self.upload(age_hours=2)
+        delete_recipes([self.create_recipe(name).pk])
+        self.assertFalse(default_storage.exists(name))
+
+    @override_settings(MEDIA_GC_GRACE_HOURS=1)
+    def test_shared_file_is_kept(self):
+        name = self.upload(age_hours=2)
+        first = self.create_recipe(name)
+        self.create_recipe(name)
+        delete_recipes([first.pk])
+        self.assertTrue(default_storage.exists(name))
+
+    @override_settings(MEDIA_GC_GRACE_HOURS=1)
+    def test_file_reuploaded_before_commit_is_kept(self):
+        # Повторная загрузка того же содержимого, строка рецепта с ней
+        # еще не закоммичена: обновленный mtime защищает файл.
+        name = self.upload(age_hours=2)
+        recipe = self.create_recipe(name)
+        self.assertEqual(self.upload(age_hours=0), name)
+        delete_recipes([recipe.pk])
+        self.assertTrue(default_storage.exists(name))
+
+    def test_file_workers_close_connections(self):
+        # Каждая задача пула закрывает соединение своего потока.
+        names = [f"recipes/images/{index}.png" for index in range(6)]
+        with (
+            mock.patch("recipes.deletion.connection") as connection,
+            mock.patch("recipes.deletion._delete_file") as delete_file,
+            ThreadPoolExecutor(max_workers=2) as executor,
+        ):
+            delete_files(names, executor)
+        self.assertEqual(
+            sorted(call.args[0] for call in delete_file.call_args_list),
+            sorted(names),
+        )
+        self.assertEqual(connection.close.call_count, FILE_WORKERS)
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from recipes.media import Collector, load_references
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class GcMediaTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        # Кеш и снимки нарочно лежат внутри каталога загрузок.
+        images = os.path.join(self.media, "recipes", "images")
+        override = override_settings(
+            MEDIA_ROOT=self.media,
+            MEDIA_STORAGE="filesystem",
+            IMAGE_CACHE_ROOT=os.path.join(images, "resized"),
+            INGREDIENT_SNAPSHOT_ROOT=os.path.join(images, "snapshots"),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        user = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password-123",
+            first_name="Иван",
+            last_name="Иванов",
+        )
+        self.referenced = self.put("recipes/images/ab/cd/used.png")
+        Recipe.objects.create(
+            author=user,
+            name="Суп",
+            image=self.referenced,
+            description="Сварить.",
+            cookingTime=10,
+        )
+        self.orphan = self.put("recipes/images/ab/ef/orphan.png")
+        self.legacy = self.put("recipes/images/legacy.png")
+        self.recent = self.put("recipes/images/12/34/new.png", age_hours=0)
+        self.kept = [
+            self.referenced,
+            self.recent,
+            self.put("recipes/images/resized/ab/cd/used-100.png"),
+            self.put("recipes/images/snapshots/ingredients.json"),
+        ]
+
+    def put(self, name, age_hours=48):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(b"image")
+        past = time.time() - age_hours * 3600
+        os.utime(path, (past, past))
+        return name
+
+    def path(self, name):
+        return os.path.join(self.media, *name.split("/"))
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command("gc_media", "--grace-hours", "24", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_keeps_files(self):
+        output = self.gc("--dry-run")
+        self.assertIn("сирот: 2", output)
+        self.assertTrue(self.exists(self.orphan))
+        self.assertTrue(self.exists(self.legacy))
+
+    def test_deletes_only_old_orphans(self):
+        self.gc()
+        self.assertFalse(self.exists(self.orphan))
+        self.assertFalse(self.exists(self.legacy))
+        for name in self.kept:
+            self.assertTrue(self.exists(name), name)
+
+    def test_quarantine_moves_orphans(self):
+        quarantine = os.path.join(self.media, "quarantine")
+        self.gc("--quarantine", quarantine)
+        self.assertFalse(self.exists(self.orphan))
+        self.assertTrue(
+            os.path.exists(os.path.join(quarantine, *self.orphan.split("/")))
+        )
+        for name in self.kept:
+            self.assertTrue(self.exists(name), name)
+
+    def test_grace_period(self):
+        self.gc("--grace-hours", "0")
+        self.assertFalse(self.exists(self.recent))
+        self.assertTrue(self.exists(self.referenced))
+
+    def test_file_touched_after_scan_is_kept(self):
+        # Повторная загрузка того же содержимого между обходом и удалением
+        # обновляет mtime.
+        collector = Collector(load_references(), grace=24 * 3600)
+        shard = os.path.join(self.media, "recipes", "images", "ab"), True
+        _, _, candidates = collector.collect(shard)
+        self.assertEqual([name for name, *_ in candidates], [self.orphan])
+        os.utime(self.path(self.orphan))
+        stats = {"files": 0, "recent": 0, "orphans": 0, "bytes": 0}
+        collector.remove(candidates, stats)
+        self.assertTrue(self.exists(self.orphan))
+        self.assertEqual(stats["orphans"], 0)
@@ -0,0 +1,211 @@
+import base64
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.storage import ContentAddressedStorage, content_hash, hashed_name
+from recipes.models import AmountIngredientInRecipe, Ingredient, Recipe
+
+User = get_user_model()
+
+
+class ChaosError(Exception):
+    pass
+
+
+def fail(*args, **kwargs):
+    raise ChaosError
+
+
+# Шаги записи рецепта, в которые внедряется сбой до коммита. Версию
+# поднимает только изменение рецепта, создание ее лишь кеширует.
+CREATE_STEPS = ("recipe", "ingredients")
+STEPS = {
+    "recipe": lambda: mock.patch.object(Recipe, "save", fail),
+    "ingredients": lambda: mock.patch.object(
+        AmountIngredientInRecipe.objects, "bulk_create", fail
+    ),
+    "version": lambda: mock.patch("recipes.signals.bump_versions", fail),
+}
+
+
+def storage_failure():
+    return mock.patch.object(ContentAddressedStorage, "save", fail)
+
+
+def make_image(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, "PNG")
+    content = buffer.getvalue()
+    name = hashed_name(
+        "recipes/images/image.png", content_hash(ContentFile(content))
+    )
+    encoded = base64.b64encode(content).decode()
+    return f"data:image/png;base64,{encoded}", name
+
+
+class RecipeWritesMixin:
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(
+            id=91001,
+            username="author",
+            email="author@example.com",
+            password="password-123",
+            first_name="Иван",
+            last_name="Иванов",
+        )
+        self.ingredients = [
+            Ingredient.objects.create(id=pk, name=name, measurment="г").pk
+            for pk, name in ((92001, "Мука"), (92002, "Соль"), (92003, "Сыр"))
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, ingredients, image):
+        return {
+            "name": "Проверка сбоев",
+            "text": "Рецепт для проверки сбоев записи.",
+            "cooking_time": 10,
+            "image": image,
+            "ingredients": [{"id": pk, "amount": 10} for pk in ingredients],
+        }
+
+    def create(self, color=(1, 2, 3)):
+        image, name = make_image(color)
+        response = self.client.post(
+            "/api/recipes/", self.payload(self.ingredients[:2], image), "json"
+        )
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data["id"]), name
+
+    def state(self, recipe):
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        return (
+            recipe.name,
+            recipe.image.name,
+            sorted(
+                recipe.amountingredientinrecipe_set.values_list(
+                    "ingredient_id", "amount"
+                )
+            ),
+        )
+
+
+class RecipeWriteFailureTests(RecipeWritesMixin, TransactionTestCase):
+    # Настоящие коммиты: файл пишется в on_commit уже после них.
+    def test_failed_create_leaves_nothing(self):
+        for step in CREATE_STEPS:
+            with self.subTest(step=step):
+                image, name = make_image((10, 20, 30))
+                with STEPS[step](), self.assertRaises(ChaosError):
+                    self.client.post(
+                        "/api/recipes/",
+                        self.payload(self.ingredients[:2], image),
+                        "json",
+                    )
+                self.assertFalse(Recipe.objects.exists())
+                self.assertFalse(default_storage.exists(name))
+
+    def test_failed_update_changes_nothing(self):
+        recipe, old_name = self.create()
+        before = self.state(recipe)
+        for step, patch in STEPS.items():
+            with self.subTest(step=step):
+                image, new_name = make_image((40, 50, 60))
+                with patch(), self.assertRaises(ChaosError):
+                    self.client.patch(
+                        f"/api/recipes/{recipe.pk}/",
+                        self.payload(self.ingredients[1:], image),
+                        "json",
+                    )
+                self.assertEqual(self.state(recipe), before)
+                self.assertTrue(default_storage.exists(old_name))
+                self.assertFalse(default_storage.exists(new_name))
+
+    def test_validation_error_leaves_nothing(self):
+        image, name = make_image((70, 80, 90))
+        response = self.client.post(
+            "/api/recipes/",
+            self.payload([self.ingredients[0], 99999], image),
+            "json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_storage_failure_on_create_keeps_recipe_without_image(self):
+        image, name = make_image((10, 20, 30))
+        with storage_failure(), self.assertLogs("api.uploads", "ERROR"):
+            response = self.client.post(
+                "/api/recipes/",
+                self.payload(self.ingredients[:2], image),
+                "json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data["image"])
+        recipe = Recipe.objects.get(pk=response.data["id"])
+        self.assertEqual(recipe.image.name, "")
+        self.assertFalse(default_storage.exists(name))
+
+    def test_storage_failure_on_update_keeps_old_image(self):
+        recipe, old_name = self.create()
+        image, new_name = make_image((40, 50, 60))
+        with storage_failure(), self.assertLogs("api.uploads", "ERROR"):
+            response = self.client.patch(
+                f"/api/recipes/{recipe.pk}/",
+                self.payload(self.ingredients[1:], image),
+                "json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["image"].endswith(old_name))
+        name, image_name, ingredients = self.state(recipe)
+        self.assertEqual(image_name, old_name)
+        self.assertEqual([pk for pk, _ in ingredients], self.ingredients[1:])
+        self.assertTrue(default_storage.exists(old_name))
+        self.assertFalse(default_storage.exists(new_name))
+
+
+class RecipeImageAfterCommitTests(RecipeWritesMixin, TestCase):
+    def test_file_is_written_only_on_commit(self):
+        recipe, old_name = self.create()
+        image, new_name = make_image((40, 50, 60))
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(
+                f"/api/recipes/{recipe.pk}/",
+                self.payload(self.ingredients[1:], image),
+                "json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(default_storage.exists(new_name))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(default_storage.exists(new_name))
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).image, new_name)
+
+
+class RecipeVersionTests(RecipeWritesMixin, TestCase):
+    def test_update_bumps_version_once(self):
+        recipe, _ = self.create()
+        version = Recipe.objects.get(pk=recipe.pk).version
+        image, _ = make_image((40, 50, 60))
+        response = self.client.patch(
+            f"/api/recipes/{recipe.pk}/",
+            self.payload(self.ingredients[1:], image),
+            "json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).version, version + 1)
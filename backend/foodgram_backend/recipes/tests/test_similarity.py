@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from recipes.models import (
+    AmountIngredientInRecipe,
+    Ingredient,
+    Recipe,
+    RecipeSimilarity,
+)
+from recipes.similarity import get_stale_recipe_ids, refresh_similarity
+
+User = get_user_model()
+
+
+class SimilarityTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password-123",
+            first_name="Иван",
+            last_name="Иванов",
+        )
+        salt = Ingredient.objects.create(
+            id=92001, name="Соль", measurment="г"
+        )
+        saffron = Ingredient.objects.create(
+            id=92002, name="Шафран", measurment="г"
+        )
+        self.soup, self.porridge, self.pilaf = (
+            Recipe.objects.create(
+                author=user,
+                name=name,
+                image=f"recipes/images/{name}.png",
+                description="Приготовить.",
+                cookingTime=10,
+            )
+            for name in ("Суп", "Каша", "Плов")
+        )
+        for recipe, ingredient in (
+            (self.soup, salt),
+            (self.porridge, salt),
+            (self.pilaf, saffron),
+        ):
+            AmountIngredientInRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1
+            )
+
+    def test_recipe_without_neighbors_is_not_recomputed(self):
+        self.assertEqual(refresh_similarity(count=5), 3)
+        self.assertFalse(
+            RecipeSimilarity.objects.filter(recipe=self.pilaf).exists()
+        )
+        self.pilaf.refresh_from_db()
+        self.assertIsNotNone(self.pilaf.similarity_computed_at)
+        self.assertEqual(get_stale_recipe_ids(), set())
+        self.assertEqual(refresh_similarity(count=5), 0)
+
+    def test_changed_recipe_is_recomputed(self):
+        refresh_similarity(count=5)
+        self.pilaf.name = "Плов с шафраном"
+        self.pilaf.save()
+        self.assertEqual(get_stale_recipe_ids(), {self.pilaf.pk})
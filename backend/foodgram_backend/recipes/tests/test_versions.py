@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class VersionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password-123",
+            first_name="Иван",
+            last_name="Иванов",
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name="Суп",
+            image="recipes/images/soup.png",
+            description="Сварить.",
+            cookingTime=10,
+        )
+
+    def assertVersionGrows(self, obj, change):
+        # Объект загружен до изменения и сохраняется целиком после него.
+        model = type(obj)
+        stale = model.objects.get(pk=obj.pk)
+        fresh = model.objects.get(pk=obj.pk)
+        change(fresh)
+        fresh.save()
+        changed = model.objects.get(pk=obj.pk).version
+        stale.save()
+        self.assertGreater(model.objects.get(pk=obj.pk).version, changed)
+
+    def test_stale_user_save_keeps_version_growing(self):
+        def rename(user):
+            user.first_name = "Петр"
+
+        self.assertVersionGrows(self.user, rename)
+
+    def test_stale_recipe_save_keeps_version_growing(self):
+        def rename(recipe):
+            recipe.name = "Борщ"
+
+        self.assertVersionGrows(self.recipe, rename)
+
+    def test_login_does_not_bump_version(self):
+        version = User.objects.get(pk=self.user.pk).version
+        self.user.save(update_fields=["last_login"])
+        self.assertEqual(User.objects.get(pk=self.user.pk).version, version)
+
+    def test_password_change_does_not_bump_version(self):
+        version = User.objects.get(pk=self.user.pk).version
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password("password-456")
+        user.save()
+        user.is_staff = True
+        user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).version, version)
+
+    def test_public_field_change_bumps_version(self):
+        version = User.objects.get(pk=self.user.pk).version
+        user = User.objects.get(pk=self.user.pk)
+        user.last_name = "Петров"
+        user.save()
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).version, version + 1
+        )
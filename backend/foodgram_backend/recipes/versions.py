@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from .models import Recipe
+
+User = get_user_model()
+
+RECIPE = "recipe"
+USER = "user"
+MODELS = {RECIPE: Recipe, USER: User}
+VERSION_KEY = "version:{kind}:{pk}"
+VERSION_TIMEOUT = 24 * 60 * 60
+# Поля пользователя, которые попадают в ответы API о рецептах и авторах.
+USER_PUBLIC_FIELDS = {
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "image",
+}
+# Версия удаленного или несуществующего объекта.
+DELETED = 0
+
+# Отправляется после коммита с аргументами kind и pks, когда версии
+# объектов выросли. По нему пересобираются производные данные.
+versions_bumped = Signal()
+
+
+def version_cache():
+    return caches["default"]
+
+
+def version_key(kind, pk):
+    return VERSION_KEY.format(kind=kind, pk=pk)
+
+
+def get_versions(dependencies):
+    # dependencies: пары (вид, pk). Версии берутся из кеша, недостающие -
+    # одним запросом на каждый вид объектов.
+    keys = {version_key(kind, pk): (kind, pk) for kind, pk in dependencies}
+    cached = version_cache().get_many(keys.keys())
+    versions = {keys[key]: version for key, version in cached.items()}
+
+    missing = {}
+    for kind, pk in keys.values():
+        if (kind, pk) not in versions:
+            missing.setdefault(kind, []).append(pk)
+    for kind, pks in missing.items():
+        rows = dict(
+            MODELS[kind].objects.filter(pk__in=pks).values_list(
+                "pk", "version"
+            )
+        )
+        for pk in pks:
+            version = rows.get(pk, DELETED)
+            versions[(kind, pk)] = version
+            # add, а не set: не затираем версию, записанную после коммита
+            # изменения, если наш запрос прочитал строку раньше.
+            version_cache().add(
+                version_key(kind, pk), version, VERSION_TIMEOUT
+            )
+    return versions
+
+
+def bump_versions(kind, pks):
+    pks = list(pks)
+    if not pks:
+        return
+    MODELS[kind].objects.filter(pk__in=pks).update(version=F("version") + 1)
+    refresh_versions(kind, pks)
+    transaction.on_commit(
+        lambda: versions_bumped.send(sender=MODELS[kind], kind=kind, pks=pks)
+    )
+
+
+def refresh_versions(kind, pks):
+    pks = list(pks)
+
+    def refresh():
+        rows = dict(
+            MODELS[kind].objects.filter(pk__in=pks).values_list(
+                "pk", "version"
+            )
+        )
+        version_cache().set_many(
+            {
+                version_key(kind, pk): rows.get(pk, DELETED)
+                for pk in pks
+            },
+            VERSION_TIMEOUT,
+        )
+
+    # До коммита другие процессы видят старую строку, поэтому кеш
+    # обновляется только после него.
+    transaction.on_commit(refresh)
+
+
+def forget_versions(kind, pks):
+    keys = {version_key(kind, pk): DELETED for pk in pks}
+    transaction.on_commit(
+        lambda: version_cache().set_many(keys, VERSION_TIMEOUT)
+    )
+
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_alter_user_options_alter_user_username"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="version",
+            field=models.PositiveBigIntegerField(
+                default=1, editable=False, verbose_name="Версия"
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:41
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class PostgresAddIndex(migrations.AddIndex):
+    # OpClass поддерживает только PostgreSQL: на других базах индекс
+    # остается в состоянии моделей, но в базе не создается.
+    def database_forwards(self, app_label, schema_editor, *args):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, *args)
+
+    def database_backwards(self, app_label, schema_editor, *args):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, *args)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0004_user_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["last_name", "first_name"], name="user_name_ordering_idx"
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="user",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("username"),
+                    name="text_pattern_ops",
+                ),
+                name="user_username_prefix_idx",
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="user",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("first_name"),
+                    name="text_pattern_ops",
+                ),
+                name="user_first_name_prefix_idx",
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="user",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("last_name"),
+                    name="text_pattern_ops",
+                ),
+                name="user_last_name_prefix_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import OpClass
+from django.db.models.functions import Upper
 from django.core.validators import RegexValidator
 
 
@@ -41,10 +43,43 @@ class User(AbstractUser):
         upload_to="users/images/", null=True, default=None
     )
 
+    # Растет при изменении публичных полей, см. recipes.versions.
+    version = models.PositiveBigIntegerField(
+        "Версия", default=1, editable=False
+    )
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
         ordering = ["last_name", "first_name"]
+        indexes = [
+            models.Index(
+                fields=["last_name", "first_name"],
+                name="user_name_ordering_idx",
+            ),
+            # Поиск по началу строки без учета регистра: istartswith
+            # превращается в UPPER(поле) LIKE UPPER('...%'), а такой LIKE
+            # использует индекс только с text_pattern_ops.
+            *(
+                models.Index(
+                    OpClass(Upper(field), name="text_pattern_ops"),
+                    name=f"user_{field}_prefix_idx",
+                )
+                for field in ("username", "first_name", "last_name")
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+    def save(self, *args, **kwargs):
+        # Версию поднимает только recipes.versions.bump_versions запросом
+        # UPDATE. Полное сохранение ранее загруженного объекта (смена
+        # пароля, аватара) не должно записать старое значение обратно.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "version"
+            ]
+        super().save(*args, **kwargs)
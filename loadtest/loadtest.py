@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+IMAGE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAA"
+    "DElEQVR4nGM4UaEBAAN0AWnL+tDXAAAAAElFTkSuQmCC"
+)
+PASSWORD = "Loadtest-password-1"
+WORDS = [
+    "молоко", "сахар", "картофель", "лук", "соль",
+    "мука", "яйца", "рис", "помидоры", "сыр",
+]
+# Доли сценариев в общем потоке запросов.
+SCENARIOS = {
+    "browse_feed": 50,
+    "autocomplete": 20,
+    "toggle_favorite": 10,
+    "toggle_shopping_cart": 10,
+    "subscriptions": 7,
+    "download_shopping_cart": 3,
+}
+CART_SIZE = 2
+PAGE_SIZE = 6
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, name, status, elapsed):
+        self.latencies[name].append(elapsed)
+        self.statuses[name][status] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        for name in sorted(self.latencies):
+            latencies = sorted(self.latencies[name])
+            statuses = self.statuses[name]
+            total = len(latencies)
+            throttled = statuses.get(429, 0)
+            errors = sum(
+                count for status, count in statuses.items()
+                if status == 0 or (status >= 400 and status != 429)
+            )
+            endpoints[name] = {
+                "requests": total,
+                "rps": round(total / duration, 2),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "error_rate": round(errors / total, 4),
+                "throttled": throttled,
+                "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            }
+        return endpoints
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return round(values[rank] * 1000, 2)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Account:
+    def __init__(self, user_id, token):
+        self.user_id = user_id
+        self.token = token
+
+
+async def setup_accounts(client, count, recipes_per_author, authors_count):
+    accounts = []
+    for index in range(count):
+        email = f"loadtest{index}@example.com"
+        await client.post("/api/users/", json={
+            "email": email,
+            "username": f"loadtest{index}",
+            "first_name": "Нагрузка",
+            "last_name": f"Тест{index}",
+            "password": PASSWORD,
+        })
+        response = await client.post(
+            "/api/auth/token/login/",
+            json={"email": email, "password": PASSWORD},
+        )
+        response.raise_for_status()
+        token = response.json()["auth_token"]
+        headers = {"Authorization": f"Token {token}"}
+        me = await client.get("/api/users/me/", headers=headers)
+        me.raise_for_status()
+        accounts.append(Account(me.json()["id"], token))
+
+    ingredients = (await client.get("/api/ingredients/")).json()
+    ingredient_ids = [item["id"] for item in ingredients]
+
+    authors = accounts[:authors_count]
+    for account in authors:
+        headers = {"Authorization": f"Token {account.token}"}
+        existing = await client.get(
+            "/api/recipes/", params={"author": account.user_id}
+        )
+        for number in range(existing.json()["count"], recipes_per_author):
+            chosen = random.sample(ingredient_ids, 5)
+            payload = {
+                "name": f"Рецепт нагрузочного теста {number}",
+                "text": "Описание",
+                "cooking_time": 10,
+                "image": IMAGE,
+                "ingredients": [{"id": pk, "amount": 100} for pk in chosen],
+            }
+            response = await client.post(
+                "/api/recipes/", headers=headers, json=payload
+            )
+            response.raise_for_status()
+
+    recipe_ids = []
+    url = "/api/recipes/?limit=100"
+    while url:
+        page = (await client.get(url)).json()
+        recipe_ids.extend(item["id"] for item in page["results"])
+        url = page["next"]
+
+    for account in accounts:
+        headers = {"Authorization": f"Token {account.token}"}
+        for author in authors:
+            if author is not account:
+                await client.post(
+                    f"/api/users/{author.user_id}/subscribe/", headers=headers
+                )
+        for recipe_id in recipe_ids[:CART_SIZE]:
+            await client.post(
+                f"/api/recipes/{recipe_id}/shopping_cart/", headers=headers
+            )
+
+    return accounts, recipe_ids
+
+
+class VirtualUser:
+    def __init__(self, client, stats, account, recipe_ids, rng, think_time):
+        self.client = client
+        self.stats = stats
+        self.headers = {"Authorization": f"Token {account.token}"}
+        self.recipe_ids = recipe_ids
+        self.pages = math.ceil(len(recipe_ids) / PAGE_SIZE)
+        self.rng = rng
+        self.think_time = think_time
+
+    async def request(self, method, url, name, auth=True, **kwargs):
+        headers = self.headers if auth else None
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, url, headers=headers, **kwargs
+            )
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        self.stats.record(
+            f"{method} {name}", status, time.perf_counter() - start
+        )
+
+    async def browse_feed(self):
+        page = self.rng.randint(1, self.pages)
+        await self.request(
+            "GET", f"/api/recipes/?page={page}&limit={PAGE_SIZE}",
+            "/api/recipes/", auth=False,
+        )
+        recipe_id = self.rng.choice(self.recipe_ids)
+        await self.request(
+            "GET", f"/api/recipes/{recipe_id}/", "/api/recipes/{id}/",
+            auth=False,
+        )
+
+    async def autocomplete(self):
+        word = self.rng.choice(WORDS)
+        for length in range(1, len(word) + 1):
+            await self.request(
+                "GET", "/api/ingredients/", "/api/ingredients/?name=",
+                auth=False, params={"name": word[:length]},
+            )
+            await asyncio.sleep(self.rng.uniform(0.05, 0.15))
+
+    async def toggle(self, relation):
+        recipe_id = self.rng.choice(self.recipe_ids[CART_SIZE:])
+        url = f"/api/recipes/{recipe_id}/{relation}/"
+        name = f"/api/recipes/{{id}}/{relation}/"
+        await self.request("POST", url, name)
+        await self.request("DELETE", url, name)
+
+    async def toggle_favorite(self):
+        await self.toggle("favorite")
+
+    async def toggle_shopping_cart(self):
+        await self.toggle("shopping_cart")
+
+    async def subscriptions(self):
+        limit = self.rng.randint(1, 5)
+        await self.request(
+            "GET", f"/api/users/subscriptions/?recipes_limit={limit}",
+            "/api/users/subscriptions/",
+        )
+
+    async def download_shopping_cart(self):
+        await self.request(
+            "GET", "/api/recipes/download_shopping_cart/",
+            "/api/recipes/download_shopping_cart/",
+        )
+
+    async def run(self, deadline):
+        names = list(SCENARIOS)
+        weights = list(SCENARIOS.values())
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(names, weights)[0]
+            await getattr(self, scenario)()
+            await asyncio.sleep(self.rng.uniform(0, self.think_time))
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.users)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        accounts, recipe_ids = await setup_accounts(
+            client, args.users, args.recipes, args.authors
+        )
+        if len(recipe_ids) <= CART_SIZE:
+            raise SystemExit("Недостаточно рецептов для запуска сценариев.")
+
+        stats = Stats()
+        users = [
+            VirtualUser(
+                client, stats, account, recipe_ids,
+                random.Random(args.seed + index), args.think_time,
+            )
+            for index, account in enumerate(accounts)
+        ]
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(user.run(deadline) for user in users))
+        duration = time.monotonic() - started
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "users": args.users,
+        "duration": round(duration, 2),
+        "seed": args.seed,
+        "endpoints": stats.report(duration),
+    }
+
+
+def print_report(report, baseline=None):
+    base = baseline["endpoints"] if baseline else {}
+    print(
+        f"commit={report['commit']} users={report['users']} "
+        f"duration={report['duration']}s"
+    )
+    header = (
+        f"{'endpoint':55} {'req':>6} {'rps':>8} {'p50':>8} "
+        f"{'p95':>8} {'p99':>8} {'err%':>6} {'429':>5}"
+    )
+    print(header)
+    for name, row in report["endpoints"].items():
+        line = (
+            f"{name:55} {row['requests']:>6} {row['rps']:>8} "
+            f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} "
+            f"{row['error_rate'] * 100:>6.2f} {row['throttled']:>5}"
+        )
+        if name in base and base[name]["p95_ms"]:
+            change = row["p95_ms"] / base[name]["p95_ms"] - 1
+            line += f"  p95 {change:+.1%} vs {baseline['commit']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Нагрузочное тестирование API Фудграма."
+    )
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--think-time", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--authors", type=int, default=5)
+    parser.add_argument("--recipes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Файл для сохранения отчета (JSON).")
+    parser.add_argument(
+        "--compare", help="Отчет предыдущего запуска для сравнения."
+    )
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
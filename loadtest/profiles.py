@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from loadtest import run
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIR = ROOT / "backend" / "foodgram_backend"
+PROFILES = ("sync", "gthread", "gevent")
+
+
+def wait_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Сервер {base_url} не ответил на /healthz.")
+
+
+def run_profile(profile, args):
+    env = dict(
+        os.environ,
+        GUNICORN_PROFILE=profile,
+        GUNICORN_BIND=args.bind,
+    )
+    if args.workers:
+        env["GUNICORN_WORKERS"] = str(args.workers)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "foodgram_backend.wsgi:application"],
+        cwd=args.app_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(args.base_url, args.startup_timeout)
+        return asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def total(report):
+    endpoints = report["endpoints"].values()
+    return {
+        "requests": sum(row["requests"] for row in endpoints),
+        "rps": round(sum(row["rps"] for row in endpoints), 2),
+        "worst_p95_ms": max(row["p95_ms"] for row in endpoints),
+        "errors": sum(
+            round(row["error_rate"] * row["requests"]) for row in endpoints
+        ),
+    }
+
+
+def print_comparison(reports):
+    names = sorted({name for r in reports.values() for name in r["endpoints"]})
+    header = f"{'endpoint':55}" + "".join(
+        f"{profile + ' p95':>14}" for profile in reports
+    )
+    print(header)
+    for name in names:
+        line = f"{name:55}"
+        for report in reports.values():
+            row = report["endpoints"].get(name)
+            line += f"{row['p95_ms'] if row else '-':>14}"
+        print(line)
+    print()
+    for profile, report in reports.items():
+        summary = total(report)
+        print(
+            f"{profile:8} rps={summary['rps']} "
+            f"requests={summary['requests']} errors={summary['errors']} "
+            f"worst p95={summary['worst_p95_ms']} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Сравнение профилей gunicorn на сценариях loadtest.py."
+    )
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--app-dir", default=str(APP_DIR))
+    parser.add_argument("--bind", default="127.0.0.1:8000")
+    parser.add_argument(
+        "--workers", type=int, help="Одинаковое число воркеров для всех."
+    )
+    parser.add_argument("--startup-timeout", type=float, default=30)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--think-time", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--authors", type=int, default=5)
+    parser.add_argument("--recipes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Файл для сохранения отчетов (JSON).")
+    args = parser.parse_args()
+    args.base_url = f"http://{args.bind}"
+
+    reports = {}
+    for profile in args.profiles:
+        print(f"Профиль {profile}...", file=sys.stderr)
+        reports[profile] = run_profile(profile, args)
+    print_comparison(reports)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(reports, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()